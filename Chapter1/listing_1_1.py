@@ -1,6 +1,9 @@
+import os
 import requests
 
-response = requests.get("http://www.example.com")
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'http://www.example.com')
+
+response = requests.get(ORIGIN_URL)
 
 items = response.headers.items()
 
@@ -1,9 +1,12 @@
+import os
 import time
 import requests
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'http://www.example.com')
+
 
 def read_example() -> None:
-    response = requests.get('http://www.example.com')
+    response = requests.get(ORIGIN_URL)
     print(response.status_code)
 
 
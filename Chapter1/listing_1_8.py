@@ -1,10 +1,13 @@
+import os
 import time
 import threading
 import requests
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
+
 
 def read_example() -> None:
-    response = requests.get("https://www.example.com")
+    response = requests.get(ORIGIN_URL)
     print(response.status_code)
 
 
@@ -1,7 +1,10 @@
 import asyncio
+import os
 from asyncio import Semaphore
 from aiohttp import ClientSession
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
+
 
 async def get_url(url: str, session: ClientSession, semaphore: Semaphore):
     print('Waiting to acquire semaphore...')
@@ -15,7 +18,7 @@ async def get_url(url: str, session: ClientSession, semaphore: Semaphore):
 async def main():
     semaphore = Semaphore(10)
     async with ClientSession() as session:
-        tasks = [get_url('https://www.example.com', session, semaphore) for _ in range(1000)]
+        tasks = [get_url(ORIGIN_URL, session, semaphore) for _ in range(1000)]
         await asyncio.gather(*tasks)
 
 
@@ -1,11 +1,14 @@
 import asyncio
+import os
 import requests
 from util import async_timed
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'http://www.example.com')
+
 
 @async_timed()
 async def get_example_status() -> int:
-    return requests.get('http://www.example.com').status_code
+    return requests.get(ORIGIN_URL).status_code
 
 
 @async_timed()
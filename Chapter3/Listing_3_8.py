@@ -32,4 +32,5 @@ async def main():
     await listen_for_connection(server_socket, asyncio.get_event_loop())
 
 
-asyncio.run(main())
+if __name__ == '__main__':
+    asyncio.run(main())
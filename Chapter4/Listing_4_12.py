@@ -1,10 +1,13 @@
 import aiohttp
 import asyncio
 import logging
+import os
 
 from aiohttp import ClientSession
 from util import async_timed
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
+
 
 async def fetch_status(session: ClientSession, url: str) -> int:
     ten_millis = aiohttp.ClientTimeout(total=1)
@@ -19,8 +22,8 @@ async def main():
     async with aiohttp.ClientSession() as session:
         fetchers = [
             asyncio.create_task(fetch_status(session, 'python://bad.com')),
-            asyncio.create_task(fetch_status(session, 'https://www.example.com')),
-            asyncio.create_task(fetch_status(session, 'https://www.example.com')),
+            asyncio.create_task(fetch_status(session, ORIGIN_URL)),
+            asyncio.create_task(fetch_status(session, ORIGIN_URL)),
         ]
 
         done, pending = await asyncio.wait(fetchers, return_when=asyncio.FIRST_EXCEPTION)
@@ -1,9 +1,12 @@
 import asyncio
 import aiohttp
+import os
 from util import async_timed
 
 from aiohttp import ClientSession
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
+
 
 async def fetch_status(session: ClientSession, url: str) -> int:
     ten_millis = aiohttp.ClientTimeout(total=1)
@@ -16,7 +19,7 @@ async def fetch_status(session: ClientSession, url: str) -> int:
 @async_timed()
 async def main():
     async with aiohttp.ClientSession() as session:
-        url = 'https://www.example.com'
+        url = ORIGIN_URL
 
         fetchers = [
             asyncio.create_task(fetch_status(session, url)),
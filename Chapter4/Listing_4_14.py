@@ -1,8 +1,11 @@
 import asyncio
 import aiohttp
+import os
 from aiohttp import ClientSession
 from util import async_timed
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
+
 
 async def fetch_status(session: ClientSession, url: str) -> int:
     ten_millis = aiohttp.ClientTimeout(total=1)
@@ -15,7 +18,7 @@ async def fetch_status(session: ClientSession, url: str) -> int:
 @async_timed()
 async def main():
     async with aiohttp.ClientSession() as session:
-        url = 'https://www.example.com'
+        url = ORIGIN_URL
 
         pending = [
             asyncio.create_task(fetch_status(session, url)),
@@ -1,8 +1,11 @@
 import asyncio
 import aiohttp
+import os
 from aiohttp import ClientSession
 from util import async_timed
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
+
 
 async def fetch_status(session: ClientSession, url: str, delay_seconds: int = 0) -> int:
     ten_millis = aiohttp.ClientTimeout(total=1)
@@ -17,8 +20,8 @@ async def fetch_status(session: ClientSession, url: str, delay_seconds: int = 0)
 
 async def main():
     async with aiohttp.ClientSession() as session:
-        api_a = fetch_status(session, 'https://www.example.com')
-        api_b = fetch_status(session, 'https://www.example.com', delay_seconds=2)
+        api_a = fetch_status(session, ORIGIN_URL)
+        api_b = fetch_status(session, ORIGIN_URL, delay_seconds=2)
 
         done, pending = await asyncio.wait([api_a, api_b], timeout=1)
 
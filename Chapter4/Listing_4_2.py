@@ -1,8 +1,11 @@
 import asyncio
 import aiohttp
+import os
 
 from aiohttp import ClientSession
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
+
 
 async def fetch_status(session: ClientSession, url: str) -> int:
     async with session.get(url) as result:
@@ -11,7 +14,7 @@ async def fetch_status(session: ClientSession, url: str) -> int:
 
 async def main():
     async with aiohttp.ClientSession() as session:
-        url = 'https://www.example.com'
+        url = ORIGIN_URL
         status = await fetch_status(session, url)
         print(f'Status for {url} was {status}')
 
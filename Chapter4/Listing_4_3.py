@@ -1,7 +1,10 @@
 import asyncio
 import aiohttp
+import os
 from aiohttp import ClientSession
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
+
 
 async def fetch_status(session: ClientSession, url: str) -> int:
     ten_millis = aiohttp.ClientTimeout(total=.01)
@@ -15,7 +18,7 @@ async def main():
     session_timeout = aiohttp.ClientTimeout(total=1, connect=.1)
 
     async with aiohttp.ClientSession(timeout=session_timeout) as session:
-        await fetch_status(session, 'https://www.example.com')
+        await fetch_status(session, ORIGIN_URL)
 
 
 asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
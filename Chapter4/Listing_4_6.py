@@ -1,28 +1,24 @@
 import asyncio
-import aiohttp
-
-from aiohttp import ClientSession
-from util import async_timed
+import os
+import sys
 
+# common lives in the repository root, one level above this folder.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-async def fetch_status(session: ClientSession, url: str) -> int:
-    ten_millis = aiohttp.ClientTimeout(total=1)
+from util import async_timed
+from common.fetch import FetchEngine
 
-    async with session.get(url, timeout=ten_millis) as result:
-        print(result.status)
-        return result.status
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
 
 
 @async_timed()
 async def main():
-    async with aiohttp.ClientSession() as session:
-        urls = ['https://www.example.com' for _ in range(100)]
-
-        # Generate a list of coroutines for each request we want to make.
-        requests = [fetch_status(session, url) for url in urls]
+    # The engine reuses pooled keep-alive connections and adapts how many requests are in flight.
+    async with FetchEngine() as engine:
+        urls = [ORIGIN_URL for _ in range(100)]
 
-        # Wait for all requests to complete.
-        status_codes = await asyncio.gather(*requests)
+        # Stream the status codes back as the requests complete.
+        status_codes = [status async for _, status in engine.stream(urls)]
 
         print(status_codes)
 
@@ -1,7 +1,16 @@
 import asyncio
-import functools
-import time
-from typing import Callable, Any
+import atexit
+import os
+import sys
+
+# Make the shared helpers in the repository root importable when a listing is run from this folder.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import instrumentation
+from common.instrumentation import async_timed
+
+# Print the latency summary of every timed coroutine once, instead of on every call.
+atexit.register(instrumentation.flush)
 
 
 async def delay(delay_seconds: int) -> int:
@@ -9,22 +18,3 @@ async def delay(delay_seconds: int) -> int:
     await asyncio.sleep(delay_seconds)
     print("Finished sleeping for {0} second(s)".format(delay_seconds))
     return delay_seconds
-
-
-def async_timed():
-    def wrapper(func: Callable) -> Callable:
-        @functools.wraps(func)
-        async def wrapped(*args, **kwargs) -> Any:
-            print('starting {0} with args {1} {2}'.format(func, args, kwargs))
-            start = time.time()
-
-            try:
-                return await func(*args, **kwargs)
-            finally:
-                end = time.time()
-                total = end - start
-                print('finished {0} in {1:.4f} second(s)'.format(func, total))
-
-        return wrapped
-
-    return wrapper
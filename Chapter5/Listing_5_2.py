@@ -1,6 +1,6 @@
 CREATE_BRAND_TABLE = \
     """
-    CREATE ABLE IF NOT EXISTS brand(
+    CREATE TABLE IF NOT EXISTS brand(
         brand_id SERIAL PRIMARY KEY,
         brand_name TEXT NOT NULL
     )
@@ -41,7 +41,7 @@ CREATE_SKU_TABLE = \
         product_color_id INT NOT NULL, 
         FOREIGN KEY (product_id) REFERENCES product(product_id), 
         FOREIGN KEY (product_size_id) REFERENCES product_size(product_size_id), 
-        FOREIGN KEY (product_color_id) REFERENCES product_color(product_color_id), 
+        FOREIGN KEY (product_color_id) REFERENCES product_color(product_color_id)
     )
     """
 
@@ -1,11 +1,14 @@
+import os
 import requests
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'http://www.example.com')
+
 
 def get_status_code(url: str) -> int:
     response = requests.get(url)
     return response.status_code
 
 
-url = 'http://www.example.com'
+url = ORIGIN_URL
 print(get_status_code(url))
 print(get_status_code(url))
@@ -1,7 +1,10 @@
+import os
 import time
 import requests
 from concurrent.futures import ThreadPoolExecutor
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
+
 
 def get_status_code(url: str) -> int:
     response = requests.get(url)
@@ -11,7 +14,7 @@ def get_status_code(url: str) -> int:
 start = time.perf_counter()
 
 with ThreadPoolExecutor(max_workers=1000) as pool:
-    urls = ['https://www.example.com' for _ in range(1000)]
+    urls = [ORIGIN_URL for _ in range(1000)]
     results = pool.map(get_status_code, urls)
     for result in results:
         print(result)
@@ -1,8 +1,11 @@
 import functools
+import os
 import requests
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'http://www.example.com')
+
 
 def get_status_code(url: str) -> int:
     response = requests.get(url)
@@ -13,7 +16,7 @@ async def main():
     loop = asyncio.get_running_loop()
 
     with ThreadPoolExecutor() as pool:
-        urls = ['http://www.example.com' for _ in range(1000)]
+        urls = [ORIGIN_URL for _ in range(1000)]
         tasks = [loop.run_in_executor(pool, functools.partial(get_status_code, url)) for url in urls]
         results = await asyncio.gather(*tasks)
         print(results)
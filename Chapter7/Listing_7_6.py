@@ -1,7 +1,10 @@
 import functools
+import os
 import requests
 import asyncio
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'http://www.example.com')
+
 
 def get_status_code(url: str) -> int:
     response = requests.get(url)
@@ -10,7 +13,7 @@ def get_status_code(url: str) -> int:
 
 async def main():
     loop = asyncio.get_running_loop()
-    urls = ['http://www.example.com' for _ in range(1000)]
+    urls = [ORIGIN_URL for _ in range(1000)]
 
     tasks = [loop.run_in_executor(None, functools.partial(get_status_code, url)) for url in urls]
     results = await asyncio.gather(*tasks)
@@ -1,6 +1,9 @@
+import os
 import requests
 import asyncio
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
+
 
 def get_status_code(url: str) -> int:
     response = requests.get(url)
@@ -8,7 +11,7 @@ def get_status_code(url: str) -> int:
 
 
 async def main():
-    urls = ['https://www.example.com' for _ in range(1000)]
+    urls = [ORIGIN_URL for _ in range(1000)]
     tasks = [asyncio.to_thread(get_status_code, url) for url in urls]
     results = await asyncio.gather(*tasks)
     print(results)
@@ -1,9 +1,12 @@
 import functools
+import os
 import requests
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
 
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'https://www.example.com')
+
 counter_lock = Lock()
 counter: int = 0
 
@@ -29,7 +32,7 @@ async def main():
 
     with ThreadPoolExecutor() as pool:
         request_count = 200
-        urls = ['https://www.example.com' for _ in range(request_count)]
+        urls = [ORIGIN_URL for _ in range(request_count)]
         reporter_task = asyncio.create_task(reporter(request_count))
         tasks = [loop.run_in_executor(pool, functools.partial(get_status_code, url)) for url in urls]
         results = await asyncio.gather(*tasks)
@@ -1,9 +1,12 @@
 import aiohttp
 import asyncio
+import os
+
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'http://www.example.com')
 
 
 async def fetch(client):
-    async with client.get('http://www.example.com') as resp:
+    async with client.get(ORIGIN_URL) as resp:
         assert resp.status == 200
         return resp.status
 
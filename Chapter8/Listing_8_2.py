@@ -1,7 +1,12 @@
 import asyncio
+import os
 from asyncio import AbstractEventLoop
+from urllib.parse import urlsplit
 from Listing_8_1 import HTTPGetClientProtocol
 
+# The protocol speaks plain HTTP, so the origin has to be an http:// URL.
+ORIGIN_URL = os.getenv('ORIGIN_URL', 'http://www.example.com')
+
 
 async def make_request(host: str, port: int, loop: AbstractEventLoop) -> str:
     def protocol_factory():
@@ -14,7 +19,8 @@ async def make_request(host: str, port: int, loop: AbstractEventLoop) -> str:
 
 async def main():
     loop = asyncio.get_running_loop()
-    result = await make_request('www.example.com', 80, loop)
+    origin = urlsplit(ORIGIN_URL)
+    result = await make_request(origin.hostname, origin.port or 80, loop)
     print(result)
 
 
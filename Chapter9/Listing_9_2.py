@@ -6,14 +6,22 @@ from aiohttp.web_response import Response
 from asyncpg import Record
 from asyncpg.pool import Pool
 from typing import List, Dict
+from util import Database
 
 routes = web.RouteTableDef()
 DB_KEY = 'database'
 
 
 async def create_database_pool(app: Application):
-    pass
+    print('Creating database pool.')
+
+    # One pool for the lifetime of the app, so requests reuse warm connections and their prepared statements.
+    database = Database(min_size=6, max_size=6)
+    await database.start()
+    app[DB_KEY] = database
 
 
 async def destroy_database_pool(app: Application):
-    pass
+    print('Destroying database pool.')
+    database: Database = app[DB_KEY]
+    await database.close()
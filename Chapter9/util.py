@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Make the shared helpers in the repository root importable when a listing is run from this folder.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.database import Database, DatabaseConfig
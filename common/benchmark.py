@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from common.kernels import count_loop, fib_naive
+
+STRATEGIES = ['sequential', 'threads', 'processes', 'asyncio']
+
+
+class Workload:
+    def __init__(self,
+                 name: str,
+                 sync_call: Callable[[Any], Any],
+                 async_call: Callable[[Any], Coroutine],
+                 argument: Any):
+        # sync_call has to be a module level function so it can be sent to a process pool.
+        self.name = name
+        self.sync_call = sync_call
+        self.async_call = async_call
+        self.argument = argument
+
+
+def scrypt_hash(password: bytes) -> bytes:
+    salt = os.urandom(16)
+    return hashlib.scrypt(password, salt=salt, n=2048, p=1, r=8)
+
+
+def get_status_code(url: str) -> int:
+    with urllib.request.urlopen(url) as response:
+        return response.status
+
+
+async def fetch_status(url: str) -> int:
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+
+    try:
+        request = f'GET {parts.path or "/"} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: close\r\n\r\n'
+        writer.write(request.encode())
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_inline(func: Callable[[Any], Any], argument: Any) -> Any:
+    # A CPU-bound coroutine that never awaits anything, which is what Listing 2.18 runs as a task.
+    return func(argument)
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def start_local_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _OkHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_workloads(url: str) -> Dict[str, Workload]:
+    return {
+        'fib': Workload('fib', fib_naive, lambda n: run_inline(fib_naive, n), 25),
+        'count': Workload('count', count_loop, lambda n: run_inline(count_loop, n), 1000000),
+        'http': Workload('http', get_status_code, fetch_status, url),
+        'scrypt': Workload('scrypt', scrypt_hash, lambda p: run_inline(scrypt_hash, p), b'password'),
+    }
+
+
+def run_strategy(strategy: str, workload: Workload, tasks: int, workers: int) -> float:
+    arguments = [workload.argument] * tasks
+    start = time.perf_counter()
+
+    if strategy == 'sequential':
+        for argument in arguments:
+            workload.sync_call(argument)
+    elif strategy == 'threads':
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(workload.sync_call, arguments))
+    elif strategy == 'processes':
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(workload.sync_call, arguments, chunksize=max(1, tasks // (workers * 4))))
+    elif strategy == 'asyncio':
+        async def main():
+            await asyncio.gather(*[workload.async_call(argument) for argument in arguments])
+
+        asyncio.run(main())
+    else:
+        raise ValueError(f'Unknown strategy {strategy}')
+
+    return time.perf_counter() - start
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    rank = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        'mean': statistics.mean(samples),
+        'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'min': min(samples),
+        'p50': percentile(samples, 50),
+        'p90': percentile(samples, 90),
+        'p99': percentile(samples, 99),
+        'max': max(samples),
+    }
+
+
+def run_benchmarks(families: List[str],
+                   strategies: List[str],
+                   tasks: int,
+                   workers: int,
+                   repetitions: int,
+                   url: Optional[str] = None) -> List[Dict[str, Any]]:
+    server = None
+
+    if url is None and 'http' in families:
+        server = start_local_server()
+        url = f'http://127.0.0.1:{server.server_address[1]}/'
+
+    workloads = make_workloads(url or '')
+    results = []
+
+    try:
+        for family in families:
+            for strategy in strategies:
+                samples = [run_strategy(strategy, workloads[family], tasks, workers) for _ in range(repetitions)]
+                results.append({
+                    'family': family,
+                    'strategy': strategy,
+                    'tasks': tasks,
+                    'workers': workers,
+                    'repetitions': repetitions,
+                    **summarize(samples),
+                })
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    return results
+
+
+def write_results(results: List[Dict[str, Any]], output_format: str, output) -> None:
+    if output_format == 'json':
+        json.dump(results, output, indent=2)
+        output.write('\n')
+    else:
+        writer = csv.DictWriter(output, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Compare concurrency strategies across the workloads of every chapter.')
+    parser.add_argument('--families', nargs='+', default=['fib', 'count', 'http', 'scrypt'],
+                        choices=['fib', 'count', 'http', 'scrypt'])
+    parser.add_argument('--strategies', nargs='+', default=STRATEGIES, choices=STRATEGIES)
+    parser.add_argument('--tasks', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--url', help='Target of the http workload, defaults to a local server')
+    parser.add_argument('--format', choices=['json', 'csv'], default='json')
+    parser.add_argument('--output', help='File to write the results to, defaults to stdout')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.families, args.strategies, args.tasks, args.workers, args.repetitions, args.url)
+
+    if args.output:
+        with open(args.output, 'w', newline='') as output:
+            write_results(results, args.format, output)
+    else:
+        write_results(results, args.format, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+import argparse
+import asyncio
+import random
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Tuple
+
+from Chapter5.Listing_5_2 import (
+    COLOR_INSERT,
+    CREATE_BRAND_TABLE,
+    CREATE_PRODUCT_COLOR_TABLE,
+    CREATE_PRODUCT_SIZE_TABLE,
+    CREATE_PRODUCT_TABLE,
+    CREATE_SKU_TABLE,
+    SIZE_INSERT,
+)
+
+SCHEMA = [
+    CREATE_BRAND_TABLE,
+    CREATE_PRODUCT_TABLE,
+    CREATE_PRODUCT_COLOR_TABLE,
+    CREATE_PRODUCT_SIZE_TABLE,
+    CREATE_SKU_TABLE,
+]
+
+# Indexes on the foreign keys are built once after the load instead of being maintained row by row.
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS product_brand_id_idx ON product(brand_id)',
+    'CREATE INDEX IF NOT EXISTS sku_product_id_idx ON sku(product_id)',
+    'CREATE INDEX IF NOT EXISTS sku_product_size_id_idx ON sku(product_size_id)',
+    'CREATE INDEX IF NOT EXISTS sku_product_color_id_idx ON sku(product_color_id)',
+]
+
+COLUMNS = {
+    'brand': ('brand_id', 'brand_name'),
+    'product': ('product_id', 'product_name', 'brand_id'),
+    'sku': ('sku_id', 'product_id', 'product_size_id', 'product_color_id'),
+}
+
+# Every table the load writes to, the seeded colors and sizes included.
+TABLES = ('brand', 'product', 'product_color', 'product_size', 'sku')
+
+COLOR_IDS = (1, 2)
+SIZE_IDS = (1, 2, 3)
+
+Row = Tuple[Any, ...]
+
+WORDS = ['shirt', 'pants', 'jeans', 'jacket', 'socks', 'shoes', 'hat', 'scarf', 'sweater', 'dress',
+         'classic', 'slim', 'relaxed', 'vintage', 'organic', 'sport', 'winter', 'summer', 'denim', 'wool']
+
+
+class CatalogNotEmpty(RuntimeError):
+    pass
+
+
+def generate_brands(count: int) -> Iterator[Row]:
+    for brand_id in range(1, count + 1):
+        yield brand_id, f'brand_{brand_id}'
+
+
+def generate_products(count: int, brands: int, seed: int = 0) -> Iterator[Row]:
+    rng = random.Random(seed)
+    for product_id in range(1, count + 1):
+        yield product_id, ' '.join(rng.choices(WORDS, k=3)), rng.randint(1, brands)
+
+
+def generate_skus(count: int, products: int, seed: int = 0) -> Iterator[Row]:
+    rng = random.Random(seed + 1)
+    for sku_id in range(1, count + 1):
+        yield sku_id, rng.randint(1, products), rng.choice(SIZE_IDS), rng.choice(COLOR_IDS)
+
+
+def batches(rows: Iterable[Row], batch_size: int) -> Iterator[List[Row]]:
+    # Only one batch is ever materialized, however large the catalog is.
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+class PostgresSink:
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def execute(self, statement: str) -> None:
+        await self.connection.execute(statement)
+
+    def transaction(self):
+        return self.connection.transaction()
+
+    async def has_rows(self, table: str) -> bool:
+        return await self.connection.fetchval(f'SELECT EXISTS(SELECT 1 FROM {table})')
+
+    async def copy(self, table: str, rows: List[Row]) -> None:
+        await self.connection.copy_records_to_table(table, records=rows, columns=COLUMNS[table])
+
+    async def executemany(self, table: str, rows: List[Row]) -> None:
+        columns = COLUMNS[table]
+        placeholders = ', '.join(f'${index}' for index in range(1, len(columns) + 1))
+        await self.connection.executemany(
+            f'INSERT INTO {table}({", ".join(columns)}) VALUES({placeholders})', rows
+        )
+
+    async def finish(self) -> None:
+        # The ids were supplied explicitly, move the SERIAL sequences past them for later inserts.
+        for table, columns in COLUMNS.items():
+            await self.connection.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', '{columns[0]}'), "
+                f"COALESCE((SELECT MAX({columns[0]}) FROM {table}), 1))"
+            )
+
+
+class SqliteSink:
+    # An offline stand-in for Postgres. sqlite3 blocks, so every call runs in a worker thread.
+    def __init__(self, path: str = ':memory:'):
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+
+    async def execute(self, statement: str) -> None:
+        # SQLite spells SERIAL PRIMARY KEY as INTEGER PRIMARY KEY.
+        await asyncio.to_thread(self.connection.executescript, statement.replace('SERIAL', 'INTEGER'))
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        await asyncio.to_thread(self.connection.execute, 'BEGIN')
+        try:
+            yield
+        except BaseException:
+            await asyncio.to_thread(self.connection.execute, 'ROLLBACK')
+            raise
+        else:
+            await asyncio.to_thread(self.connection.execute, 'COMMIT')
+
+    async def has_rows(self, table: str) -> bool:
+        cursor = await asyncio.to_thread(self.connection.execute, f'SELECT EXISTS(SELECT 1 FROM {table})')
+        return bool(cursor.fetchone()[0])
+
+    async def executemany(self, table: str, rows: List[Row]) -> None:
+        columns = COLUMNS[table]
+        statement = f'INSERT INTO {table}({", ".join(columns)}) VALUES({", ".join("?" * len(columns))})'
+        await asyncio.to_thread(self.connection.executemany, statement, rows)
+
+    # SQLite has no COPY, a batched executemany inside a transaction is its fastest path.
+    copy = executemany
+
+    async def finish(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+async def load_table(sink, table: str, rows: Iterable[Row], batch_size: int, method: str) -> Dict[str, float]:
+    load = sink.copy if method == 'copy' else sink.executemany
+    loaded = 0
+    start = time.perf_counter()
+
+    for batch in batches(rows, batch_size):
+        # One transaction per batch keeps commits rare without holding one huge transaction open.
+        async with sink.transaction():
+            await load(table, batch)
+        loaded += len(batch)
+
+    elapsed = time.perf_counter() - start
+    return {'rows': loaded, 'seconds': elapsed, 'rows_per_second': loaded / elapsed if elapsed else 0.0}
+
+
+async def load_catalog(sink,
+                       brands: int = 100,
+                       products: int = 100000,
+                       skus: int = 1000000,
+                       batch_size: int = 10000,
+                       method: str = 'copy',
+                       seed: int = 0) -> Dict[str, Dict[str, float]]:
+    for statement in SCHEMA:
+        await sink.execute(statement)
+
+    # The ids are generated from 1 every time, so loading into a filled catalog can only fail part way
+    # through on a duplicate key. Refuse up front instead.
+    filled = [table for table in TABLES if await sink.has_rows(table)]
+    if filled:
+        raise CatalogNotEmpty(f'Catalog already has rows in {", ".join(filled)}, load into empty tables')
+
+    await sink.execute(COLOR_INSERT)
+    await sink.execute(SIZE_INSERT)
+
+    report = {
+        'brand': await load_table(sink, 'brand', generate_brands(brands), batch_size, method),
+        'product': await load_table(sink, 'product', generate_products(products, brands, seed), batch_size, method),
+        'sku': await load_table(sink, 'sku', generate_skus(skus, products, seed), batch_size, method),
+    }
+
+    start = time.perf_counter()
+    for statement in INDEXES:
+        await sink.execute(statement)
+    report['indexes'] = {'seconds': time.perf_counter() - start}
+
+    await sink.finish()
+    return report
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.backend == 'sqlite':
+        sink = SqliteSink(args.sqlite_path)
+        try:
+            report = await load_catalog(sink, args.brands, args.products, args.skus, args.batch_size, args.method)
+        finally:
+            sink.close()
+    else:
+        import asyncpg
+        from common.database import DatabaseConfig
+
+        connection = await asyncpg.connect(**DatabaseConfig.from_env().connect_kwargs())
+        try:
+            report = await load_catalog(PostgresSink(connection), args.brands, args.products, args.skus,
+                                        args.batch_size, args.method)
+        finally:
+            await connection.close()
+
+    for table, stats in report.items():
+        print(table, {name: round(value, 3) for name, value in stats.items()})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk load a generated brand/product/SKU catalog.')
+    parser.add_argument('--backend', choices=['postgres', 'sqlite'], default='postgres')
+    parser.add_argument('--sqlite-path', default=':memory:')
+    parser.add_argument('--method', choices=['copy', 'executemany'], default='copy')
+    parser.add_argument('--brands', type=int, default=100)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--skus', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,223 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+from asyncpg import Connection, Record
+from asyncpg.pool import Pool
+
+from common.instrumentation import LatencyHistogram
+
+
+class DatabaseConfig:
+    # Defaults match the credentials hard-coded in the Chapter 5 listings, the environment overrides them.
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: int = 5432,
+                 user: str = 'postgres',
+                 database: str = 'postgres',
+                 password: str = 'password'):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.database = database
+        self.password = password
+
+    @classmethod
+    def from_env(cls, database: str = 'postgres') -> 'DatabaseConfig':
+        return cls(
+            host=os.getenv('PGHOST', '127.0.0.1'),
+            port=int(os.getenv('PGPORT', '5432')),
+            user=os.getenv('PGUSER', 'postgres'),
+            database=os.getenv('PGDATABASE', database),
+            password=os.getenv('PGPASSWORD', 'password'),
+        )
+
+    def connect_kwargs(self) -> Dict[str, Any]:
+        return {'host': self.host, 'port': self.port, 'user': self.user,
+                'database': self.database, 'password': self.password}
+
+
+class Database:
+    def __init__(self,
+                 config: Optional[DatabaseConfig] = None,
+                 min_size: int = 2,
+                 max_size: int = 10,
+                 statement_cache_size: int = 1024,
+                 acquire_timeout: float = 5,
+                 health_check_interval: Optional[float] = 30):
+        self.config = config or DatabaseConfig.from_env()
+        self.min_size = min_size
+        self.max_size = max_size
+        # asyncpg prepares every query it runs and keeps the prepared statement on the connection, so
+        # once a connection is warm a query costs a single bind/execute round trip.
+        self.statement_cache_size = statement_cache_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.pool: Optional[Pool] = None
+
+        self.acquire_wait = LatencyHistogram()
+        self.acquire_timeouts = 0
+        self.failed_health_checks = 0
+        self.saturated_health_checks = 0
+        self._health_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self.pool = await asyncpg.create_pool(
+            **self.config.connect_kwargs(),
+            min_size=self.min_size,
+            max_size=self.max_size,
+            statement_cache_size=self.statement_cache_size,
+            max_inactive_connection_lifetime=300,
+        )
+
+        if self.health_check_interval:
+            self._health_task = asyncio.create_task(self._check_health_forever())
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def __aenter__(self) -> 'Database':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Connection]:
+        start = time.perf_counter_ns()
+
+        try:
+            connection = await self.pool.acquire(timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.acquire_timeouts += 1
+            raise
+
+        # How long callers queue for a free connection, the first thing to look at when sizing the pool.
+        self.acquire_wait.record(time.perf_counter_ns() - start)
+
+        try:
+            yield connection
+        finally:
+            await self.pool.release(connection)
+
+    async def fetch(self, query: str, *args) -> List[Record]:
+        async with self.connection() as connection:
+            return await connection.fetch(query, *args)
+
+    async def fetchrow(self, query: str, *args) -> Optional[Record]:
+        async with self.connection() as connection:
+            return await connection.fetchrow(query, *args)
+
+    async def fetchval(self, query: str, *args) -> Any:
+        async with self.connection() as connection:
+            return await connection.fetchval(query, *args)
+
+    async def execute(self, query: str, *args) -> str:
+        async with self.connection() as connection:
+            return await connection.execute(query, *args)
+
+    async def fetch_concurrently(self, queries: Dict[str, Tuple[str, Sequence[Any]]]) -> Dict[str, List[Record]]:
+        # Independent queries each get their own pooled connection and run at the same time, instead of
+        # queueing one after another on a single connection.
+        async def run(query: str, args: Sequence[Any]) -> List[Record]:
+            return await self.fetch(query, *args)
+
+        results = await asyncio.gather(*[run(query, args) for query, args in queries.values()])
+        return dict(zip(queries.keys(), results))
+
+    async def stream_batches(self, query: str, *args, batch_size: int = 1000) -> AsyncIterator[List[Record]]:
+        # A server-side cursor sends batch_size rows per round trip, so only one batch is ever in memory.
+        # Cursors only live inside a transaction, which holds the connection until the stream is done.
+        async with self.connection() as connection:
+            async with connection.transaction(readonly=True):
+                cursor = await connection.cursor(query, *args)
+
+                while batch := await cursor.fetch(batch_size):
+                    yield batch
+
+    async def stream(self, query: str, *args, batch_size: int = 1000) -> AsyncIterator[Record]:
+        async for batch in self.stream_batches(query, *args, batch_size=batch_size):
+            for record in batch:
+                yield record
+
+    async def check_health(self, timeout: float = 1) -> bool:
+        try:
+            async with self.connection() as connection:
+                try:
+                    await connection.fetchval('SELECT 1', timeout=timeout)
+                    healthy = True
+                except (asyncio.TimeoutError, OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                    healthy = False
+        except asyncio.TimeoutError:
+            # No connection came free in time. The pool is saturated, not broken, and recycling the busy
+            # but healthy connections would only make it worse.
+            self.saturated_health_checks += 1
+            return True
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+            # Opening a new connection failed, there is nothing in the pool to expire for that.
+            self.failed_health_checks += 1
+            return False
+
+        if not healthy:
+            self.failed_health_checks += 1
+            # A pooled connection failed SELECT 1. Replace every connection on its next release, they
+            # may all point at a dead server.
+            await self.pool.expire_connections()
+
+        return healthy
+
+    async def _check_health_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await self.check_health()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': self.pool.get_size() if self.pool else 0,
+            'idle': self.pool.get_idle_size() if self.pool else 0,
+            'acquires': self.acquire_wait.count,
+            'acquire_wait_p50_ms': self.acquire_wait.percentile(50) / 1e6,
+            'acquire_wait_p99_ms': self.acquire_wait.percentile(99) / 1e6,
+            'acquire_timeouts': self.acquire_timeouts,
+            'failed_health_checks': self.failed_health_checks,
+            'saturated_health_checks': self.saturated_health_checks,
+        }
+
+
+SKUS_WITH_PRODUCT = \
+    """
+    SELECT s.sku_id, s.product_size_id, s.product_color_id, p.product_id, p.product_name, p.brand_id
+    FROM sku s
+    JOIN product p ON p.product_id = s.product_id
+    """
+
+
+if __name__ == '__main__':
+    async def main():
+        async with Database() as database:
+            page = await database.fetch_concurrently({
+                'brands': ('SELECT brand_id, brand_name FROM brand LIMIT $1', (20,)),
+                'products': ('SELECT product_id, product_name FROM product LIMIT $1', (20,)),
+                'colors': ('SELECT product_color_id, product_color_name FROM product_color', ()),
+                'sizes': ('SELECT product_size_id, product_size_name FROM product_size', ()),
+            })
+            print({name: len(records) for name, records in page.items()})
+
+            count = 0
+            async for _ in database.stream(SKUS_WITH_PRODUCT, batch_size=5000):
+                count += 1
+
+            print(f'Streamed {count} skus')
+            print(database.stats())
+
+    asyncio.run(main())
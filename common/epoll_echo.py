@@ -0,0 +1,276 @@
+import argparse
+import os
+import resource
+import select
+import selectors
+import socket
+import time
+from multiprocessing import Process
+from typing import Dict, List, Tuple
+
+READ_CHUNK = 65536
+HIGH_WATERMARK = 1 << 20
+LOW_WATERMARK = 1 << 16
+
+
+class _Poller:
+    # Edge-triggered epoll where the platform has it, otherwise the level-triggered selectors module
+    # from Listing 3.7. The handlers always drain sockets until they would block, so they work with both.
+    def __init__(self):
+        self._epoll = select.epoll() if hasattr(select, 'epoll') else None
+        self._selector = None if self._epoll is not None else selectors.DefaultSelector()
+
+    def register(self, sock: socket.socket, writable: bool) -> None:
+        if self._epoll is not None:
+            events = select.EPOLLIN | select.EPOLLET | select.EPOLLRDHUP
+            self._epoll.register(sock.fileno(), events | (select.EPOLLOUT if writable else 0))
+        else:
+            self._selector.register(sock, selectors.EVENT_READ)
+
+    def want_write(self, sock: socket.socket, writable: bool) -> None:
+        # With edge triggering the write interest is registered once up front, only select needs updating.
+        if self._selector is not None:
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writable else 0)
+            self._selector.modify(sock, events)
+
+    def unregister(self, sock: socket.socket) -> None:
+        if self._epoll is not None:
+            self._epoll.unregister(sock.fileno())
+        else:
+            self._selector.unregister(sock)
+
+    def poll(self, timeout: float) -> List[Tuple[int, bool, bool]]:
+        if self._epoll is not None:
+            return [
+                (fd, bool(events & (select.EPOLLIN | select.EPOLLRDHUP | select.EPOLLHUP | select.EPOLLERR)),
+                 bool(events & select.EPOLLOUT))
+                for fd, events in self._epoll.poll(timeout)
+            ]
+
+        return [
+            (key.fd, bool(events & selectors.EVENT_READ), bool(events & selectors.EVENT_WRITE))
+            for key, events in self._selector.select(timeout)
+        ]
+
+    def close(self) -> None:
+        if self._epoll is not None:
+            self._epoll.close()
+        else:
+            self._selector.close()
+
+
+class _Connection:
+    __slots__ = ('sock', 'output', 'output_offset', 'reading_paused')
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        # Unsent bytes live in one bytearray, output_offset marks how much of it was already sent.
+        self.output = bytearray()
+        self.output_offset = 0
+        self.reading_paused = False
+
+    def pending(self) -> int:
+        return len(self.output) - self.output_offset
+
+
+class EchoEngine:
+    def __init__(self, host: str = '127.0.0.1', port: int = 8000, backlog: int = 4096):
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((host, port))
+        self.server_socket.listen(backlog)
+        self.server_socket.setblocking(False)
+        self.address = self.server_socket.getsockname()
+
+        self._poller = _Poller()
+        self._poller.register(self.server_socket, writable=False)
+        self._connections: Dict[int, _Connection] = {}
+
+        # Every read goes into the same preallocated buffer, nothing is allocated per chunk.
+        self._read_buffer = bytearray(READ_CHUNK)
+        self._read_view = memoryview(self._read_buffer)
+        self._running = False
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._connections)
+
+    def serve_forever(self) -> None:
+        self._running = True
+        server_fd = self.server_socket.fileno()
+
+        try:
+            while self._running:
+                # Block in the kernel until something happens instead of spinning on accept().
+                for fd, readable, writable in self._poller.poll(1):
+                    if fd == server_fd:
+                        self._accept()
+                        continue
+
+                    connection = self._connections.get(fd)
+                    if connection is None:
+                        continue
+                    if writable and not self._flush(connection):
+                        continue
+                    if readable and not connection.reading_paused:
+                        self._read(connection)
+        finally:
+            self.close()
+
+    def stop(self) -> None:
+        self._running = False
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                sock, _ = self.server_socket.accept()
+            except BlockingIOError:
+                return
+
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._connections[sock.fileno()] = _Connection(sock)
+            self._poller.register(sock, writable=True)
+
+    def _read(self, connection: _Connection) -> None:
+        sock = connection.sock
+
+        while True:
+            try:
+                received = sock.recv_into(self._read_view)
+            except BlockingIOError:
+                return
+            except OSError:
+                self._drop(connection)
+                return
+
+            if received == 0:
+                self._drop(connection)
+                return
+
+            if not self._send(connection, self._read_view[:received]):
+                return
+
+            # Stop reading while the peer is not consuming its echoes, the flush resumes reading.
+            if connection.pending() > HIGH_WATERMARK:
+                connection.reading_paused = True
+                return
+
+    def _send(self, connection: _Connection, data: memoryview) -> bool:
+        sent = 0
+
+        if not connection.pending():
+            try:
+                sent = connection.sock.send(data)
+            except BlockingIOError:
+                pass
+            except OSError:
+                self._drop(connection)
+                return False
+
+        if sent < len(data):
+            if not connection.pending():
+                self._poller.want_write(connection.sock, True)
+            connection.output += data[sent:]
+
+        return True
+
+    def _flush(self, connection: _Connection) -> bool:
+        while connection.pending():
+            try:
+                with memoryview(connection.output) as view:
+                    sent = connection.sock.send(view[connection.output_offset:])
+            except BlockingIOError:
+                return True
+            except OSError:
+                self._drop(connection)
+                return False
+
+            connection.output_offset += sent
+
+        connection.output.clear()
+        connection.output_offset = 0
+        self._poller.want_write(connection.sock, False)
+
+        if connection.reading_paused:
+            connection.reading_paused = False
+            # An edge was consumed while paused, so drain whatever arrived in the meantime.
+            self._read(connection)
+
+        return connection.sock.fileno() in self._connections
+
+    def _drop(self, connection: _Connection) -> None:
+        fd = connection.sock.fileno()
+        self._connections.pop(fd, None)
+        self._poller.unregister(connection.sock)
+        connection.sock.close()
+
+    def close(self) -> None:
+        for connection in list(self._connections.values()):
+            self._drop(connection)
+
+        self._poller.unregister(self.server_socket)
+        self._poller.close()
+        self.server_socket.close()
+
+
+def _raise_file_limit(wanted: int) -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < wanted:
+        target = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+def _serve(host: str, port: int, connections: int) -> None:
+    _raise_file_limit(connections + 1024)
+    EchoEngine(host, port).serve_forever()
+
+
+def _cpu_seconds(pid: int) -> float:
+    # utime and stime are the 14th and 15th fields of /proc/<pid>/stat, in clock ticks.
+    with open(f'/proc/{pid}/stat') as stat:
+        fields = stat.read().rsplit(')', 1)[1].split()
+
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def load_test(connections: int, idle_seconds: float, host: str = '127.0.0.1', port: int = 8000) -> None:
+    _raise_file_limit(connections + 1024)
+    server = Process(target=_serve, args=(host, port, connections), daemon=True)
+    server.start()
+    time.sleep(.5)
+
+    clients = []
+    try:
+        for _ in range(connections):
+            clients.append(socket.create_connection((host, port)))
+
+        for client in clients[:10]:
+            client.sendall(b'ping\r\n')
+            assert client.recv(1024) == b'ping\r\n'
+
+        print(f'Holding {len(clients)} idle connections for {idle_seconds} second(s)')
+        cpu_before = _cpu_seconds(server.pid)
+        time.sleep(idle_seconds)
+        cpu_used = _cpu_seconds(server.pid) - cpu_before
+        print(f'Server used {cpu_used:.3f} CPU second(s), {100 * cpu_used / idle_seconds:.2f}% of a core')
+    finally:
+        for client in clients:
+            client.close()
+        server.terminate()
+        server.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Epoll based echo server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--load-test', type=int, metavar='CONNECTIONS',
+                        help='Open this many idle connections and report the CPU used by the server')
+    parser.add_argument('--idle-seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    if args.load_test:
+        load_test(args.load_test, args.idle_seconds, args.host, args.port)
+    else:
+        EchoEngine(args.host, args.port).serve_forever()
@@ -0,0 +1,179 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Tuple, Union
+
+import aiohttp
+from aiohttp import ClientSession
+
+from common.http_cache import HttpCache
+from common.window import bounded_as_completed
+
+
+def create_connector(limit: int = 100,
+                     limit_per_host: int = 20,
+                     dns_cache_seconds: int = 300,
+                     keepalive_timeout: float = 30) -> aiohttp.TCPConnector:
+    # Reuse keep-alive connections and cached DNS answers instead of paying a handshake per request,
+    # while capping how many sockets we open in total and against any one host.
+    return aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        ttl_dns_cache=dns_cache_seconds,
+        use_dns_cache=True,
+        keepalive_timeout=keepalive_timeout,
+    )
+
+
+def create_session(timeout: float = 10, **connector_options) -> ClientSession:
+    return aiohttp.ClientSession(
+        connector=create_connector(**connector_options),
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+async def fetch_status(session: ClientSession, url: str) -> int:
+    # Only the status is needed, but read the body anyway: aiohttp closes a connection whose body was
+    # left unread instead of returning it to the keep-alive pool.
+    async with session.get(url) as result:
+        await result.read()
+        return result.status
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1) -> None:
+        # The lock keeps waiters in arrival order, the first one sleeps until it can be served.
+        async with self._lock:
+            self._refill()
+
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+
+            self._tokens -= tokens
+
+
+class AdaptiveLimiter:
+    # An additive increase / multiplicative decrease limit on requests in flight. Every fast success
+    # lets one more request in, errors and latency well above the best seen so far cut the limit.
+    def __init__(self,
+                 initial: int = 10,
+                 minimum: int = 1,
+                 maximum: int = 500,
+                 latency_tolerance: float = 2.0,
+                 backoff: float = .7):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self.best_latency: Optional[float] = None
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency: Optional[float], failed: bool) -> None:
+        if failed:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+        elif latency is not None:
+            if self.best_latency is None or latency < self.best_latency:
+                self.best_latency = latency
+
+            if latency > self.best_latency * self.latency_tolerance:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+FetchResult = Tuple[str, Union[int, Exception]]
+
+
+class FetchEngine:
+    def __init__(self,
+                 session: Optional[ClientSession] = None,
+                 rate: Optional[float] = None,
+                 limiter: Optional[AdaptiveLimiter] = None,
+                 cache: Optional[HttpCache] = None):
+        self._session = session
+        self._owns_session = session is None
+        self.bucket = TokenBucket(rate) if rate else None
+        self.limiter = limiter or AdaptiveLimiter()
+        self.cache = cache
+
+    async def __aenter__(self) -> 'FetchEngine':
+        if self._session is None:
+            self._session = create_session()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @asynccontextmanager
+    async def throttle(self) -> AsyncIterator[Dict[str, bool]]:
+        # Wraps one request to the origin in the rate limit and the adaptive concurrency limit.
+        # Set outcome['failed'] to count a response as a failure, exceptions always count as one. A
+        # cancelled request, say from a consumer that stopped early, says nothing about the origin and
+        # leaves the limit alone.
+        if self.bucket is not None:
+            await self.bucket.acquire()
+
+        await self.limiter.acquire()
+        start = time.perf_counter()
+        outcome = {'failed': False}
+        latency: Optional[float] = None
+
+        try:
+            yield outcome
+            latency = time.perf_counter() - start
+        except Exception:
+            outcome['failed'] = True
+            raise
+        finally:
+            await self.limiter.release(None if outcome['failed'] else latency, outcome['failed'])
+
+    async def fetch_status(self, url: str) -> int:
+        # Cache hits and requests collapsed into one already in flight never reach the limiters. Like
+        # fetch_status this is a GET, the cached body also answers later full fetches of the URL.
+        if self.cache is not None:
+            return (await self.cache.fetch(self._session, url, throttle=self.throttle)).status
+
+        async with self.throttle() as outcome:
+            status = await fetch_status(self._session, url)
+            outcome['failed'] = status == 429 or status >= 500
+            return status
+
+    async def _fetch_result(self, url: str) -> FetchResult:
+        try:
+            return url, await self.fetch_status(url)
+        except Exception as e:
+            return url, e
+
+    async def stream(self,
+                     urls: Union[Iterable[str], AsyncIterable[str]],
+                     window: int = 1000) -> AsyncIterator[FetchResult]:
+        # Results come back as they complete. At most `window` requests are created ahead of time;
+        # the adaptive limiter decides how many of those are actually on the wire.
+        async for _, result in bounded_as_completed(urls, self._fetch_result, window):
+            yield result
@@ -0,0 +1,166 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+
+class FrameTooLarge(ValueError):
+    pass
+
+
+class Framer(ABC):
+    # Accumulates received bytes in one bytearray and hands out complete frames as memoryview slices
+    # of it, without copying. feed returns every frame completed by the data, cut out of the buffer
+    # already, so each frame is handed out exactly once. A frame is only valid until the next call to
+    # feed or reset, copy it with bytes() to keep it longer.
+    #
+    # FrameTooLarge is only raised once the good frames before the oversized one have been returned;
+    # the next feed raises it (feed(b'') does not need new data). The framer never stays stuck on the
+    # oversized frame: see the subclasses for where parsing resumes, and reset() starts over from an
+    # empty buffer. After a protocol error the usual response is still to close the connection.
+    def __init__(self, max_frame_size: int = 1 << 20):
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray()
+        # Everything before _start has already been handed out as a frame.
+        self._start = 0
+
+    @property
+    def buffered(self) -> int:
+        return len(self._buffer) - self._start
+
+    def feed(self, data: bytes) -> List[memoryview]:
+        self._compact()
+
+        try:
+            self._buffer += data
+        except BufferError:
+            # A caller still holds a frame from the last feed, so the buffer cannot be resized in place.
+            self._buffer = self._buffer + data
+
+        return self._frames()
+
+    def reset(self) -> None:
+        # A new bytearray rather than clearing the old one, which frames handed out earlier may still view.
+        self._buffer = bytearray()
+        self._start = 0
+
+    def _compact(self) -> None:
+        if not self._start:
+            return
+
+        try:
+            del self._buffer[:self._start]
+        except BufferError:
+            self._buffer = self._buffer[self._start:]
+
+        self._rebase(self._start)
+        self._start = 0
+
+    def _rebase(self, removed: int) -> None:
+        pass
+
+    @abstractmethod
+    def _frames(self) -> List[memoryview]:
+        pass
+
+    @abstractmethod
+    def encode(self, payload: bytes) -> bytes:
+        pass
+
+
+class LineFramer(Framer):
+    # An oversized line is dropped and parsing resumes after the next delimiter, so one bad line does not
+    # take the rest of the stream with it.
+    def __init__(self, delimiter: bytes = b'\r\n', max_frame_size: int = 1 << 20, keep_delimiter: bool = False):
+        super().__init__(max_frame_size)
+        self.delimiter = delimiter
+        self.keep_delimiter = keep_delimiter
+        # Where the next search for the delimiter starts, so no byte is scanned twice.
+        self._scan_offset = 0
+        # Set after an oversized line without a delimiter: its tail is discarded as it arrives.
+        self._skipping = False
+
+    def reset(self) -> None:
+        super().reset()
+        self._scan_offset = 0
+        self._skipping = False
+
+    def _rebase(self, removed: int) -> None:
+        self._scan_offset = max(0, self._scan_offset - removed)
+
+    def _frames(self) -> List[memoryview]:
+        buffer = self._buffer
+        delimiter_length = len(self.delimiter)
+        frames = []
+
+        with memoryview(buffer) as view:
+            while True:
+                end = buffer.find(self.delimiter, max(self._start, self._scan_offset))
+
+                if end == -1:
+                    # A delimiter split across two chunks can start in the last delimiter_length - 1 bytes.
+                    self._scan_offset = max(self._start, len(buffer) - delimiter_length + 1)
+
+                    if self._skipping:
+                        # Still inside the oversized line, nothing before the scan offset is kept.
+                        self._start = self._scan_offset
+                    elif self.buffered > self.max_frame_size and not frames:
+                        size = self.buffered
+                        self.reset()
+                        self._skipping = True
+                        raise FrameTooLarge(f'No delimiter in the last {size} bytes')
+                    return frames
+
+                frame_end = end + delimiter_length
+
+                if self._skipping:
+                    self._skipping = False
+                elif end - self._start > self.max_frame_size:
+                    if frames:
+                        return frames
+
+                    size = end - self._start
+                    self._start = self._scan_offset = frame_end
+                    raise FrameTooLarge(f'Frame of {size} bytes is over the limit')
+                else:
+                    frames.append(view[self._start:frame_end if self.keep_delimiter else end])
+
+                self._start = frame_end
+                self._scan_offset = frame_end
+
+    def encode(self, payload: bytes) -> bytes:
+        return bytes(payload) + self.delimiter
+
+
+class LengthPrefixedFramer(Framer):
+    # An oversized length cannot be skipped reliably, the header itself may be garbage. The buffer is
+    # reset, and since the stream is most likely out of step the connection should be closed.
+    def __init__(self, header_size: int = 4, byteorder: str = 'big', max_frame_size: int = 1 << 20):
+        super().__init__(max_frame_size)
+        self.header_size = header_size
+        self.byteorder = byteorder
+
+    def _frames(self) -> List[memoryview]:
+        buffer = self._buffer
+        frames = []
+
+        with memoryview(buffer) as view:
+            while len(buffer) - self._start >= self.header_size:
+                body_start = self._start + self.header_size
+                length = int.from_bytes(view[self._start:body_start], self.byteorder)
+
+                if length > self.max_frame_size:
+                    if frames:
+                        return frames
+
+                    self.reset()
+                    raise FrameTooLarge(f'Frame of {length} bytes is over the limit')
+
+                if len(buffer) - body_start < length:
+                    break
+
+                frames.append(view[body_start:body_start + length])
+                self._start = body_start + length
+
+        return frames
+
+    def encode(self, payload: bytes) -> bytes:
+        return len(payload).to_bytes(self.header_size, self.byteorder) + bytes(payload)
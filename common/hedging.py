@@ -0,0 +1,175 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from common.instrumentation import LatencyHistogram
+
+T = TypeVar('T')
+
+# The absolute loop.time() by which the current request has to finish. Tasks copy the context when they
+# are created, so every nested fetch started under a deadline sees the same value.
+current_deadline: ContextVar[Optional[float]] = ContextVar('current_deadline', default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    pass
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    # A nested deadline can only make the overall one shorter, never longer.
+    expires = asyncio.get_running_loop().time() + seconds
+    outer = current_deadline.get()
+
+    if outer is not None:
+        expires = min(expires, outer)
+
+    token = current_deadline.set(expires)
+    try:
+        yield expires
+    finally:
+        current_deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    expires = current_deadline.get()
+
+    if expires is None:
+        return None
+
+    return max(0.0, expires - asyncio.get_running_loop().time())
+
+
+async def within_deadline(awaitable: Awaitable[T]) -> T:
+    left = remaining()
+
+    if left is None:
+        return await awaitable
+
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded('Deadline exceeded') from None
+
+
+class Hedger:
+    # Sends a backup request when the first one is slower than `percentile` of the latencies seen so
+    # far, keeps whichever answers first and cancels the other. max_hedge_ratio caps the extra load.
+    def __init__(self,
+                 percentile: float = 95,
+                 initial_delay: float = .1,
+                 min_samples: int = 20,
+                 max_hedge_ratio: float = .1,
+                 recompute_every: int = 100):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.recompute_every = recompute_every
+        self.latencies = LatencyHistogram()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        # The percentile scans the whole histogram, far too slow to redo on every request. It is cached and
+        # only recomputed once recompute_every more latencies have been recorded.
+        self._delay: Optional[float] = None
+        self._delay_samples = 0
+
+    def hedge_delay(self) -> float:
+        count = self.latencies.count
+        if count < self.min_samples:
+            return self.initial_delay
+
+        if self._delay is None or count - self._delay_samples >= self.recompute_every:
+            self._delay = self.latencies.percentile(self.percentile) / 1e9
+            self._delay_samples = count
+
+        return self._delay
+
+    def _may_hedge(self) -> bool:
+        return self.hedges < self.max_hedge_ratio * self.requests
+
+    async def _timed(self, request: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter_ns()
+        try:
+            result = await request()
+        except asyncio.CancelledError:
+            # The losing attempt is exactly the slow one. Record how long it had taken when it was
+            # cancelled, a lower bound on its latency, or the hedge delay only ever learns the fast ones.
+            self.latencies.record(time.perf_counter_ns() - start)
+            raise
+        self.latencies.record(time.perf_counter_ns() - start)
+        return result
+
+    async def _race(self, request: Callable[[], Awaitable[T]]) -> T:
+        primary = asyncio.create_task(self._timed(request))
+        tasks = {primary}
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay())
+
+            if not done and self._may_hedge():
+                self.hedges += 1
+                tasks.add(asyncio.create_task(self._timed(request)))
+
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+
+                # A failed attempt only ends the race once no other attempt can still answer.
+                if not tasks:
+                    return done.pop().result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call(self, request: Callable[[], Awaitable[T]]) -> T:
+        # request is a factory, each attempt needs a fresh coroutine.
+        self.requests += 1
+        return await within_deadline(self._race(request))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'hedge_win_rate': self.hedge_wins / self.hedges if self.hedges else 0.0,
+            'hedge_delay_s': self.hedge_delay(),
+        }
+
+
+if __name__ == '__main__':
+    import random
+
+    async def slow_api() -> int:
+        # Mostly fast, with a long tail like the slow "API B" in Listing 4.16.
+        await asyncio.sleep(random.choice([.01] * 19 + [1]))
+        return 200
+
+    async def main():
+        hedger = Hedger()
+        latencies = LatencyHistogram()
+
+        for _ in range(300):
+            start = time.perf_counter_ns()
+            with deadline(2):
+                await hedger.call(slow_api)
+            latencies.record(time.perf_counter_ns() - start)
+
+        print(hedger.stats())
+        print(f'p50 {latencies.percentile(50) / 1e6:.1f} ms, p99 {latencies.percentile(99) / 1e6:.1f} ms')
+
+        try:
+            with deadline(.05):
+                await within_deadline(asyncio.sleep(1))
+        except DeadlineExceeded:
+            print('Deadline exceeded as expected')
+
+    asyncio.run(main())
@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from email.utils import parsedate_to_datetime
+from typing import AsyncContextManager, Callable, Dict, Mapping, Optional, Tuple
+
+from aiohttp import ClientSession
+
+# Wraps every request that actually goes to the origin, for example in FetchEngine's limiters.
+Throttle = Callable[[], AsyncContextManager]
+
+# Final statuses a shared cache may store (RFC 9111). Errors like 429 and 5xx are never kept: serving
+# one after the origin has recovered would hide the recovery from the caller and its limiters.
+CACHEABLE_STATUSES = frozenset({200, 203, 204, 206, 300, 301, 404, 410})
+
+
+class CachedResponse:
+    __slots__ = ('url', 'status', 'headers', 'body', 'stored_at', 'max_age')
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], body: Optional[bytes],
+                 stored_at: float, max_age: Optional[float]):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        # None when only the status was fetched.
+        self.body = body
+        self.stored_at = stored_at
+        self.max_age = max_age
+
+    @property
+    def size(self) -> int:
+        return len(self.body or b'') + sum(len(k) + len(v) for k, v in self.headers.items())
+
+    def is_fresh(self) -> bool:
+        return self.max_age is not None and time.time() - self.stored_at < self.max_age
+
+    def validators(self) -> Dict[str, str]:
+        # Conditional request headers that let the origin answer 304 instead of resending the body.
+        headers = {}
+        if 'etag' in self.headers:
+            headers['If-None-Match'] = self.headers['etag']
+        if 'last-modified' in self.headers:
+            headers['If-Modified-Since'] = self.headers['last-modified']
+        return headers
+
+
+def parse_cache_control(headers: Mapping[str, str]) -> Tuple[bool, Optional[float]]:
+    # Returns whether the response may be stored and for how many seconds it is fresh.
+    directives = {}
+    for directive in headers.get('cache-control', '').split(','):
+        name, _, value = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"')
+
+    if 'no-store' in directives or 'private' in directives:
+        return False, None
+
+    if 'no-cache' in directives:
+        return True, 0.0
+
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                return True, float(directives[name])
+            except ValueError:
+                return True, 0.0
+
+    if 'expires' in headers:
+        try:
+            return True, max(0.0, parsedate_to_datetime(headers['expires']).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return True, 0.0
+
+    # Without freshness information a response can still be revalidated if it has a validator.
+    return 'etag' in headers or 'last-modified' in headers, 0.0
+
+
+class MemoryCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: 'OrderedDict[str, CachedResponse]' = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        if entry.size > self.max_bytes:
+            return
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old.size
+
+        self._entries[key] = entry
+        self.size += entry.size
+
+        # Evict the least recently used entries until we are back under the cap.
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+
+class DiskCache:
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        path = self._path(key)
+        try:
+            with open(path + '.json') as metadata_file:
+                metadata = json.load(metadata_file)
+
+            body = None
+            if metadata['has_body']:
+                with open(path + '.body', 'rb') as body_file:
+                    body = body_file.read()
+        except (OSError, ValueError, KeyError):
+            return None
+
+        return CachedResponse(metadata['url'], metadata['status'], metadata['headers'], body,
+                              metadata['stored_at'], metadata['max_age'])
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        path = self._path(key)
+
+        if entry.body is not None:
+            with open(path + '.body.tmp', 'wb') as body_file:
+                body_file.write(entry.body)
+            os.replace(path + '.body.tmp', path + '.body')
+
+        metadata = {
+            'url': entry.url,
+            'status': entry.status,
+            'headers': entry.headers,
+            'has_body': entry.body is not None,
+            'stored_at': entry.stored_at,
+            'max_age': entry.max_age,
+        }
+
+        # Write the metadata last and atomically, so a reader never sees it point at a missing body.
+        with open(path + '.json.tmp', 'w') as metadata_file:
+            json.dump(metadata, metadata_file)
+        os.replace(path + '.json.tmp', path + '.json')
+
+
+class HttpCache:
+    def __init__(self, memory: Optional[MemoryCache] = None, disk: Optional[DiskCache] = None):
+        self.memory = memory or MemoryCache()
+        self.disk = disk
+        self.hits = 0
+        # Requests that joined a fetch already in flight instead of making their own.
+        self.coalesced = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def _lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self.memory.get(key)
+
+        if entry is None and self.disk is not None:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                self.memory.put(key, entry)
+
+        return entry
+
+    async def _store(self, key: str, entry: CachedResponse) -> None:
+        self.memory.put(key, entry)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.put, key, entry)
+
+    async def _fetch(self,
+                     session: ClientSession,
+                     url: str,
+                     status_only: bool,
+                     throttle: Throttle) -> CachedResponse:
+        key = ('HEAD ' if status_only else 'GET ') + url
+        cached = await self._lookup(key)
+
+        # A full response also answers a status-only lookup.
+        if cached is None and status_only:
+            cached = await self._lookup('GET ' + url)
+
+        if cached is not None and cached.is_fresh():
+            self.hits += 1
+            return cached
+
+        request = session.head if status_only else session.get
+        headers = cached.validators() if cached is not None else {}
+
+        async with throttle() as outcome, request(url, headers=headers) as response:
+            # Let the limiters back off on overload responses, not just on exceptions.
+            if outcome is not None:
+                outcome['failed'] = response.status == 429 or response.status >= 500
+
+            response_headers = {name.lower(): value for name, value in response.headers.items()}
+            storable, max_age = parse_cache_control(response_headers)
+
+            if response.status == 304 and cached is not None:
+                self.revalidated += 1
+                cached.headers.update(response_headers)
+                entry = CachedResponse(url, cached.status, cached.headers, cached.body, time.time(), max_age)
+            else:
+                self.misses += 1
+                # Status-only requests never read a body.
+                body = None if status_only else await response.read()
+                entry = CachedResponse(url, response.status, response_headers, body, time.time(), max_age)
+
+        if storable and entry.status in CACHEABLE_STATUSES:
+            await self._store(key, entry)
+
+        return entry
+
+    async def fetch(self,
+                    session: ClientSession,
+                    url: str,
+                    status_only: bool = False,
+                    throttle: Throttle = nullcontext) -> CachedResponse:
+        # Single flight: concurrent requests for the same URL share one trip to the origin.
+        key = ('HEAD ' if status_only else 'GET ') + url
+        in_flight = self._in_flight.get(key)
+
+        if in_flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(in_flight)
+
+        task = asyncio.ensure_future(self._fetch(session, url, status_only, throttle))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def fetch_status(self, session: ClientSession, url: str, throttle: Throttle = nullcontext) -> int:
+        return (await self.fetch(session, url, True, throttle)).status
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'coalesced': self.coalesced, 'revalidated': self.revalidated, 'misses': self.misses,
+                'memory_bytes': self.memory.size}
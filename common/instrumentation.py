@@ -0,0 +1,223 @@
+import asyncio
+import functools
+import time
+from asyncio import Task
+from typing import Callable, Any, Dict, List, Optional
+
+Snapshot = Dict[str, Dict[str, Any]]
+
+
+class LatencyHistogram:
+    # A log-linear (HDR-style) histogram of nanosecond values. Every power of two is split into
+    # 2 ** significant_bits linear sub-buckets, so the relative error of any percentile is bounded by
+    # 1 / 2 ** significant_bits (about 3% with the default) while memory stays fixed.
+    def __init__(self, significant_bits: int = 5):
+        self._significant_bits = significant_bits
+        self._sub_bucket_count = 1 << significant_bits
+        self._linear_limit = self._sub_bucket_count << 1
+        self._counts: List[int] = [0] * ((64 - significant_bits + 1) * self._sub_bucket_count)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < self._linear_limit:
+            return value
+
+        # Keep the top significant_bits + 1 bits of the value, the rest only selects the exponent.
+        exponent = value.bit_length() - self._significant_bits - 1
+        return exponent * self._sub_bucket_count + (value >> exponent)
+
+    def _highest_equivalent_value(self, index: int) -> int:
+        if index < self._linear_limit:
+            return index
+
+        exponent = index // self._sub_bucket_count - 1
+        mantissa = index - exponent * self._sub_bucket_count
+        return ((mantissa + 1) << exponent) - 1
+
+    def record(self, value: int) -> None:
+        if value < 0:
+            value = 0
+
+        self._counts[self._index(value)] += 1
+
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        self.count += 1
+        self.total += value
+
+    def percentile(self, percentile: float) -> int:
+        if self.count == 0:
+            return 0
+
+        # The rank of the value we are looking for, at least the first recorded value.
+        rank = max(1, int(percentile / 100 * self.count + 0.5))
+        seen = 0
+
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self._highest_equivalent_value(index), self.max)
+
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        if other._significant_bits != self._significant_bits:
+            raise ValueError('Cannot merge histograms with a different precision')
+
+        for index, bucket_count in enumerate(other._counts):
+            if bucket_count:
+                self._counts[index] += bucket_count
+
+        if other.count:
+            self.min = other.min if self.count == 0 else min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.count += other.count
+            self.total += other.total
+
+    def reset(self) -> None:
+        self._counts = [0] * len(self._counts)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+
+class FunctionStats:
+    __slots__ = ('name', 'histogram', 'calls', 'in_flight')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.histogram = LatencyHistogram()
+        # Every call is counted, while the histogram only holds the calls that were sampled.
+        self.calls = 0
+        self.in_flight = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        histogram = self.histogram
+        return {
+            'calls': self.calls,
+            'sampled': histogram.count,
+            'in_flight': self.in_flight,
+            'min_ns': histogram.min,
+            'mean_ns': histogram.mean(),
+            'p50_ns': histogram.percentile(50),
+            'p99_ns': histogram.percentile(99),
+            'p999_ns': histogram.percentile(99.9),
+            'max_ns': histogram.max,
+        }
+
+    def reset(self) -> None:
+        # The in-flight gauge describes calls that are still running, so it survives a reset.
+        self.histogram.reset()
+        self.calls = 0
+
+
+_registry: Dict[str, FunctionStats] = {}
+
+
+def get_stats(name: str) -> FunctionStats:
+    stats = _registry.get(name)
+
+    if stats is None:
+        stats = _registry[name] = FunctionStats(name)
+
+    return stats
+
+
+def snapshot(reset: bool = False) -> Snapshot:
+    result = {name: stats.snapshot() for name, stats in _registry.items()}
+
+    if reset:
+        for stats in _registry.values():
+            stats.reset()
+
+    return result
+
+
+def format_snapshot(stats: Snapshot) -> str:
+    lines = []
+
+    for name, values in stats.items():
+        lines.append(
+            '{0}: calls={1} in_flight={2} p50={3:.4f}s p99={4:.4f}s p999={5:.4f}s max={6:.4f}s'.format(
+                name,
+                values['calls'],
+                values['in_flight'],
+                values['p50_ns'] / 1e9,
+                values['p99_ns'] / 1e9,
+                values['p999_ns'] / 1e9,
+                values['max_ns'] / 1e9
+            )
+        )
+
+    return '\n'.join(lines)
+
+
+def print_sink(stats: Snapshot) -> None:
+    if stats:
+        print(format_snapshot(stats))
+
+
+def flush(sink: Callable[[Snapshot], Any] = print_sink, reset: bool = False) -> Snapshot:
+    # Only functions that were actually called are handed to the sink.
+    stats = {name: values for name, values in snapshot(reset).items() if values['calls'] or values['in_flight']}
+    sink(stats)
+    return stats
+
+
+def start_periodic_flush(interval: float,
+                         sink: Callable[[Snapshot], Any] = print_sink,
+                         reset: bool = True) -> Task:
+    async def flush_forever():
+        while True:
+            await asyncio.sleep(interval)
+            flush(sink, reset)
+
+    return asyncio.create_task(flush_forever())
+
+
+def async_timed(name: Optional[str] = None, sample_every: int = 1):
+    if sample_every < 1:
+        raise ValueError('sample_every must be at least 1')
+
+    def wrapper(func: Callable) -> Callable:
+        stats = get_stats(name or '{0}.{1}'.format(func.__module__, func.__qualname__))
+        histogram = stats.histogram
+        countdown = sample_every
+
+        @functools.wraps(func)
+        async def wrapped(*args, **kwargs) -> Any:
+            nonlocal countdown
+            stats.calls += 1
+            stats.in_flight += 1
+            countdown -= 1
+
+            # Calls that are not sampled only pay for a few integer operations.
+            if countdown:
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    stats.in_flight -= 1
+
+            countdown = sample_every
+            start = time.perf_counter_ns()
+
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.record(time.perf_counter_ns() - start)
+                stats.in_flight -= 1
+
+        wrapped.stats = stats
+        return wrapped
+
+    return wrapper
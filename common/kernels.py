@@ -0,0 +1,129 @@
+import functools
+import time
+from typing import Callable, Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The chapters use fib(1) == 0 and fib(2) == 1, every mode below keeps that convention.
+
+
+def fib_naive(n: int) -> int:
+    if n == 1:
+        return 0
+    elif n == 2:
+        return 1
+    else:
+        return fib_naive(n - 1) + fib_naive(n - 2)
+
+
+@functools.lru_cache(maxsize=None)
+def fib_memo(n: int) -> int:
+    if n == 1:
+        return 0
+    elif n == 2:
+        return 1
+    else:
+        return fib_memo(n - 1) + fib_memo(n - 2)
+
+
+def fib_iterative(n: int) -> int:
+    previous, current = 0, 1
+
+    if n == 1:
+        return previous
+
+    for _ in range(n - 2):
+        previous, current = current, previous + current
+
+    return current
+
+
+def count_loop(count_to: int) -> int:
+    counter = 0
+    while counter < count_to:
+        counter += 1
+
+    return counter
+
+
+def count_closed_form(count_to: int) -> int:
+    # The loop stops as soon as counter reaches count_to, and never runs for count_to <= 0.
+    return max(count_to, 0)
+
+
+def count_numpy(count_to: int, chunk_size: int = 1 << 20) -> int:
+    if np is None:
+        raise RuntimeError('The numpy count kernel requires numpy to be installed')
+
+    # Add up the increments a chunk at a time so memory stays bounded by chunk_size.
+    counter = 0
+    ones = np.ones(chunk_size, dtype=np.int64)
+
+    while counter < count_to:
+        size = min(chunk_size, count_to - counter)
+        counter += int(ones[:size].sum())
+
+    return counter
+
+
+FIB_KERNELS: Dict[str, Callable[[int], int]] = {
+    'naive': fib_naive,
+    'memo': fib_memo,
+    'iterative': fib_iterative,
+}
+
+COUNT_KERNELS: Dict[str, Callable[[int], int]] = {
+    'loop': count_loop,
+    'closed_form': count_closed_form,
+    'numpy': count_numpy,
+}
+
+
+def fib(n: int, mode: str = 'iterative') -> int:
+    return FIB_KERNELS[mode](n)
+
+
+def count(count_to: int, mode: str = 'closed_form') -> int:
+    return COUNT_KERNELS[mode](count_to)
+
+
+def benchmark(kernels: Dict[str, Callable[[int], int]],
+              reference: str,
+              argument: int,
+              repeat: int = 3) -> List[Tuple[str, float, float]]:
+    # Time every kernel against the same argument, returning (mode, best time, speedup over reference).
+    timings = {}
+    expected = kernels[reference](argument)
+
+    for mode, kernel in kernels.items():
+        if mode == 'numpy' and np is None:
+            continue
+
+        best = float('inf')
+        for _ in range(repeat):
+            if kernel is fib_memo:
+                fib_memo.cache_clear()
+
+            start = time.perf_counter()
+            result = kernel(argument)
+            end = time.perf_counter()
+            best = min(best, end - start)
+
+        if result != expected:
+            raise AssertionError(f'{mode} returned {result}, expected {expected}')
+
+        timings[mode] = best
+
+    return [(mode, elapsed, timings[reference] / elapsed) for mode, elapsed in timings.items()]
+
+
+if __name__ == '__main__':
+    for name, kernels, reference, argument in [
+        ('fib', FIB_KERNELS, 'naive', 30),
+        ('count', COUNT_KERNELS, 'loop', 10000000),
+    ]:
+        for mode, elapsed, speedup in benchmark(kernels, reference, argument):
+            print(f'{name}({argument}) {mode}: {elapsed:.6f} second(s), {speedup:.1f}x')
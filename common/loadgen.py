@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from common.instrumentation import LatencyHistogram
+from common.origin import OriginServer, add_config_arguments, config_from_arguments
+
+
+class LoadResult:
+    def __init__(self):
+        self.latencies = LatencyHistogram()
+        self.statuses: Counter = Counter()
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'requests': self.latencies.count,
+            'errors': self.errors,
+            'requests_per_second': self.latencies.count / self.elapsed if self.elapsed else 0.0,
+            'statuses': dict(self.statuses),
+            'p50_ms': self.latencies.percentile(50) / 1e6,
+            'p90_ms': self.latencies.percentile(90) / 1e6,
+            'p99_ms': self.latencies.percentile(99) / 1e6,
+            'p999_ms': self.latencies.percentile(99.9) / 1e6,
+            'max_ms': self.latencies.max / 1e6,
+        }
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> None:
+    while size := int((await reader.readline()).split(b';')[0], 16):
+        await reader.readexactly(size + 2)
+
+    # Skip any trailers up to the blank line that ends the body.
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        pass
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, bool]:
+    # Returns the status and whether the connection can carry another request.
+    version, status, *_ = (await reader.readline()).split()
+    keep_alive = version == b'HTTP/1.1'
+    length: Optional[int] = None
+    chunked = False
+
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.partition(b':')
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'transfer-encoding':
+            chunked = value.endswith(b'chunked')
+        elif name == b'connection':
+            keep_alive = value == b'keep-alive' or (keep_alive and value != b'close')
+
+    if chunked:
+        await _read_chunked(reader)
+    elif length is not None:
+        await reader.readexactly(length)
+    else:
+        # Neither a length nor chunks: the body runs until the server closes the connection.
+        await reader.read()
+        keep_alive = False
+
+    return int(status), keep_alive
+
+
+def check_url(url: str) -> None:
+    # The generator speaks plain HTTP/1.1 over its own sockets, TLS is not supported.
+    parts = urlsplit(url)
+    if parts.scheme != 'http' or not parts.hostname:
+        raise ValueError(f'Only http:// URLs can be loaded, got {url!r}')
+
+
+async def _connection(url: str, deadline: float, remaining: Dict[str, int], result: LoadResult) -> None:
+    parts = urlsplit(url)
+    target = parts.path or '/'
+    if parts.query:
+        target += '?' + parts.query
+    request = f'GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n\r\n'.encode()
+
+    reader: Optional[asyncio.StreamReader] = None
+    writer: Optional[asyncio.StreamWriter] = None
+
+    # Each connection is a closed loop: one request at a time over keep-alive, like a browser tab.
+    while time.perf_counter() < deadline and remaining['requests'] > 0:
+        remaining['requests'] -= 1
+        start = time.perf_counter_ns()
+
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+
+            writer.write(request)
+            status, keep_alive = await _read_response(reader)
+            result.latencies.record(time.perf_counter_ns() - start)
+            result.statuses[status] += 1
+
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            result.errors += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+async def generate_load(url: str, connections: int, duration: float, requests: Optional[int] = None) -> LoadResult:
+    check_url(url)
+    result = LoadResult()
+    remaining = {'requests': requests if requests is not None else float('inf')}
+    start = time.perf_counter()
+    deadline = start + duration
+
+    await asyncio.gather(*[_connection(url, deadline, remaining, result) for _ in range(connections)])
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    origin = None
+    url = args.url
+
+    # Without a target, load the bundled origin server running in this same process.
+    if url is None:
+        origin = OriginServer(config_from_arguments(args), port=0)
+        await origin.start()
+        url = origin.url
+
+    try:
+        result = await generate_load(url, args.connections, args.duration, args.requests)
+    finally:
+        if origin is not None:
+            await origin.close()
+
+    for name, value in result.summary().items():
+        print(f'{name}: {value:.3f}' if isinstance(value, float) else f'{name}: {value}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HTTP load generator reporting req/s and latency percentiles.')
+    parser.add_argument('--url', help='http:// URL to load (no https), defaults to a local origin server')
+    parser.add_argument('--connections', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--requests', type=int, help='Stop after this many requests')
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    if args.url is not None:
+        try:
+            check_url(args.url)
+        except ValueError as e:
+            parser.error(str(e))
+
+    asyncio.run(main(args))
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from asyncio import AbstractEventLoop, Handle, Task
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from common.instrumentation import LatencyHistogram
+
+_original_run: Callable[[Handle], None] = Handle._run
+_active_monitor: Optional['LoopMonitor'] = None
+
+
+def describe_callback(handle: Handle) -> str:
+    callback = getattr(handle, '_callback', None)
+    owner = getattr(callback, '__self__', None)
+
+    # A task step is a bound method of the task, so blame the coroutine the task is running.
+    if isinstance(owner, Task):
+        coro = owner.get_coro()
+        return getattr(coro, '__qualname__', None) or repr(coro)
+
+    if owner is not None:
+        return '{0}.{1}'.format(type(owner).__qualname__, getattr(callback, '__name__', '?'))
+
+    return getattr(callback, '__qualname__', None) or repr(callback)
+
+
+def _timed_run(handle: Handle) -> None:
+    monitor = _active_monitor
+
+    if monitor is None:
+        return _original_run(handle)
+
+    start = time.perf_counter()
+    try:
+        _original_run(handle)
+    finally:
+        duration = time.perf_counter() - start
+        # Describing the callback is the expensive part, so only do it for slow ones.
+        if duration >= monitor.slow_callback_duration:
+            monitor.record_slow_callback(describe_callback(handle), duration)
+
+
+class OffenderStats:
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class LoopMonitor:
+    # An always-on replacement for asyncio.run(debug=True): a heartbeat task measures how late the
+    # loop wakes it up, and every callback slower than slow_callback_duration is blamed on the
+    # coroutine or handle that ran it.
+    def __init__(self,
+                 interval: float = .1,
+                 slow_callback_duration: float = .1,
+                 window: float = 60.0,
+                 max_events: int = 10000):
+        self.interval = interval
+        self.slow_callback_duration = slow_callback_duration
+        self.window = window
+        self.lag = LatencyHistogram()
+        self.last_lag = 0.0
+        self.totals: Dict[str, OffenderStats] = {}
+        self._events: Deque[Tuple[float, str, float]] = deque(maxlen=max_events)
+        self._heartbeat: Optional[Task] = None
+
+    async def _beat(self, loop: AbstractEventLoop) -> None:
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(0.0, loop.time() - expected)
+            self.lag.record(int(self.last_lag * 1e9))
+
+    def start(self) -> None:
+        global _active_monitor
+
+        if _active_monitor is not None and _active_monitor is not self:
+            raise RuntimeError('Another loop monitor is already running')
+
+        _active_monitor = self
+        Handle._run = _timed_run
+        self._heartbeat = asyncio.create_task(self._beat(asyncio.get_running_loop()))
+
+    def stop(self) -> None:
+        global _active_monitor
+
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+        if _active_monitor is self:
+            _active_monitor = None
+            Handle._run = _original_run
+
+    async def __aenter__(self) -> 'LoopMonitor':
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def record_slow_callback(self, name: str, duration: float) -> None:
+        self._events.append((time.monotonic(), name, duration))
+
+        stats = self.totals.get(name)
+        if stats is None:
+            stats = self.totals[name] = OffenderStats()
+
+        stats.count += 1
+        stats.total += duration
+        stats.max = max(stats.max, duration)
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.window
+
+        while self._events and self._events[0][0] < cutoff:
+            self._events.popleft()
+
+    def top_offenders(self, n: int = 10) -> List[Dict[str, Any]]:
+        # Rank everything that blocked the loop inside the rolling window by total blocking time.
+        self._prune()
+        window: Dict[str, OffenderStats] = {}
+
+        for _, name, duration in self._events:
+            stats = window.get(name)
+            if stats is None:
+                stats = window[name] = OffenderStats()
+
+            stats.count += 1
+            stats.total += duration
+            stats.max = max(stats.max, duration)
+
+        ranked = sorted(window.items(), key=lambda item: item[1].total, reverse=True)[:n]
+
+        return [
+            {'name': name, 'count': stats.count, 'total_s': stats.total, 'max_s': stats.max}
+            for name, stats in ranked
+        ]
+
+    def lag_snapshot(self) -> Dict[str, float]:
+        return {
+            'last_s': self.last_lag,
+            'p50_s': self.lag.percentile(50) / 1e9,
+            'p99_s': self.lag.percentile(99) / 1e9,
+            'max_s': self.lag.max / 1e9,
+        }
+
+
+if __name__ == '__main__':
+    async def cpu_bound_work() -> int:
+        counter = 0
+        for _ in range(10000000):
+            counter += 1
+
+        return counter
+
+    async def main():
+        async with LoopMonitor() as monitor:
+            await asyncio.gather(cpu_bound_work(), cpu_bound_work(), asyncio.sleep(1))
+            await asyncio.sleep(.5)
+
+            print(f'Loop lag: {monitor.lag_snapshot()}')
+            for offender in monitor.top_offenders():
+                print(offender)
+
+    asyncio.run(main())
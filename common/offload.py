@@ -0,0 +1,171 @@
+import asyncio
+import atexit
+import functools
+import importlib
+import math
+import os
+from asyncio import AbstractEventLoop, Future
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+Call = Tuple[tuple, dict]
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_max_workers = os.cpu_count() or 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+
+    # The pool is only started the first time CPU-bound work is submitted.
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=_max_workers)
+
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+
+    if _process_pool is not None:
+        _process_pool.shutdown()
+        _process_pool = None
+
+
+atexit.register(shutdown_process_pool)
+
+
+def _resolve(module_name: str, qualname: str) -> Callable:
+    target: Any = importlib.import_module(module_name)
+    for attribute in qualname.split('.'):
+        target = getattr(target, attribute)
+
+    # The module attribute is the dispatching wrapper, the worker needs the original function.
+    return getattr(target, '__cpu_bound__', target)
+
+
+def _run_chunk(module_name: str, qualname: str, calls: List[Call]) -> List[Tuple[bool, Any]]:
+    func = _resolve(module_name, qualname)
+    loop = asyncio.new_event_loop() if asyncio.iscoroutinefunction(func) else None
+    results = []
+
+    try:
+        for args, kwargs in calls:
+            try:
+                if loop is None:
+                    results.append((True, func(*args, **kwargs)))
+                else:
+                    results.append((True, loop.run_until_complete(func(*args, **kwargs))))
+            except Exception as e:
+                # Keep one failing call from failing the rest of its chunk.
+                results.append((False, e))
+    finally:
+        if loop is not None:
+            loop.close()
+
+    return results
+
+
+class _Batcher:
+    def __init__(self, func: Callable, chunk_size: int):
+        self._module = func.__module__
+        self._qualname = func.__qualname__
+        self._chunk_size = chunk_size
+        self._pending: List[Tuple[Call, Future]] = []
+
+    def submit(self, loop: AbstractEventLoop, args: tuple, kwargs: dict) -> Future:
+        future = loop.create_future()
+
+        # Calls made in the same iteration of the event loop are shipped to the pool together.
+        if not self._pending:
+            loop.call_soon(self._flush, loop)
+
+        self._pending.append(((args, kwargs), future))
+        return future
+
+    def _flush(self, loop: AbstractEventLoop) -> None:
+        pending, self._pending = self._pending, []
+        pool = get_process_pool()
+
+        # Spread the calls over every worker first and only group them when there are more calls
+        # than workers, so a couple of long calls still run in parallel.
+        chunk_length = min(self._chunk_size, math.ceil(len(pending) / _max_workers))
+
+        for start in range(0, len(pending), chunk_length):
+            chunk = pending[start:start + chunk_length]
+            calls = [call for call, _ in chunk]
+            futures = [future for _, future in chunk]
+            job = loop.run_in_executor(pool, _run_chunk, self._module, self._qualname, calls)
+            job.add_done_callback(functools.partial(self._resolve_futures, futures))
+
+    @staticmethod
+    def _resolve_futures(futures: List[Future], job: Future) -> None:
+        if job.cancelled():
+            for future in futures:
+                future.cancel()
+            return
+
+        error = job.exception()
+
+        for index, future in enumerate(futures):
+            if future.done():
+                continue
+
+            if error is not None:
+                future.set_exception(error)
+                continue
+
+            ok, value = job.result()[index]
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+def cpu_bound(chunk_size: int = 16):
+    # Marks a module level function (plain or async) as CPU-bound. Calling the decorated function
+    # returns an awaitable that runs it in the shared process pool, keeping the event loop free.
+    def wrapper(func: Callable) -> Callable:
+        batcher = _Batcher(func, chunk_size)
+
+        @functools.wraps(func)
+        async def wrapped(*args, **kwargs) -> Any:
+            return await batcher.submit(asyncio.get_running_loop(), args, kwargs)
+
+        wrapped.__cpu_bound__ = func
+        return wrapped
+
+    return wrapper
+
+
+async def offload(func: Callable, *args, **kwargs) -> Any:
+    # Run an undecorated function in the shared process pool.
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    return await loop.run_in_executor(get_process_pool(), call)
+
+
+if __name__ == '__main__':
+    import time
+
+    @cpu_bound()
+    async def cpu_bound_work(iterations: int = 100000000) -> int:
+        counter = 0
+
+        for _ in range(iterations):
+            counter += 1
+
+        return counter
+
+    async def main():
+        start = time.perf_counter()
+        results = await asyncio.gather(cpu_bound_work(20000000), cpu_bound_work(20000000))
+        end = time.perf_counter()
+        print(f'{results} in {end - start:.4f} second(s) on {os.cpu_count()} core(s)')
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[cpu_bound_work(1000) for _ in range(1000)])
+        end = time.perf_counter()
+        print(f'{len(results)} small calls in {end - start:.4f} second(s)')
+
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import random
+from asyncio import StreamReader, StreamWriter
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+
+class OriginConfig:
+    def __init__(self,
+                 latency: str = 'fixed',
+                 latency_ms: float = 0,
+                 jitter_ms: float = 0,
+                 error_rate: float = 0,
+                 payload_size: int = 1256,
+                 slow_loris_rate: float = 0,
+                 drip_interval_ms: float = 100):
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.payload_size = payload_size
+        self.slow_loris_rate = slow_loris_rate
+        self.drip_interval_ms = drip_interval_ms
+
+    def sample_latency(self, latency_ms: float) -> float:
+        if latency_ms <= 0:
+            return 0.0
+
+        if self.latency == 'uniform':
+            delay = random.uniform(max(0.0, latency_ms - self.jitter_ms), latency_ms + self.jitter_ms)
+        elif self.latency == 'exponential':
+            delay = random.expovariate(1 / latency_ms)
+        elif self.latency == 'lognormal':
+            # A long tailed distribution with median latency_ms, jitter_ms sets how wide the tail is.
+            delay = random.lognormvariate(0, self.jitter_ms / latency_ms if self.jitter_ms else .5) * latency_ms
+        else:
+            delay = latency_ms
+
+        return delay / 1000
+
+
+class OriginServer:
+    # A stand-in for www.example.com. Query parameters override the configuration per request, for
+    # example /?latency_ms=2000 for the slow API in Listing 4.16 or /?status=500.
+    def __init__(self, config: OriginConfig, host: str = '127.0.0.1', port: int = 8080):
+        self.config = config
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._client_connected, self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}/'
+
+    async def _client_connected(self, reader: StreamReader, writer: StreamWriter) -> None:
+        try:
+            # Keep-alive: serve requests on this connection until the client closes it or asks us to.
+            while request_line := await reader.readline():
+                headers: Dict[str, str] = {}
+
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                if 'content-length' in headers:
+                    await reader.readexactly(int(headers['content-length']))
+
+                parts = request_line.decode('latin-1').split()
+                keep_alive = headers.get('connection', '').lower() != 'close' and parts[-1] == 'HTTP/1.1'
+                await self._respond(writer, parts[0], parts[1], keep_alive)
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: StreamWriter, method: str, target: str, keep_alive: bool) -> None:
+        self.requests += 1
+        config = self.config
+        params = dict(parse_qsl(urlsplit(target).query))
+
+        await asyncio.sleep(config.sample_latency(float(params.get('latency_ms', config.latency_ms))))
+
+        if 'status' in params:
+            status = int(params['status'])
+        else:
+            status = 500 if random.random() < config.error_rate else 200
+
+        body = b'' if method == 'HEAD' else b'x' * int(params.get('size', config.payload_size))
+        # Like www.example.com the content is cacheable for a week, but an error must never be kept by a
+        # cache downstream, or it would outlive the failure that caused it.
+        cache_control = 'max-age=604800' if status < 400 else 'no-store'
+        head = (
+            f'HTTP/1.1 {status} {"OK" if status < 400 else "Error"}\r\n'
+            f'Content-Type: text/html; charset=UTF-8\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Cache-Control: {cache_control}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n'
+            f'\r\n'
+        ).encode()
+
+        if random.random() < float(params.get('slow_loris_rate', config.slow_loris_rate)):
+            # Slow loris: trickle the response out one byte at a time.
+            response = head + body
+            for index in range(len(response)):
+                writer.write(response[index:index + 1])
+                await writer.drain()
+                await asyncio.sleep(config.drip_interval_ms / 1000)
+        else:
+            writer.write(head + body)
+            await writer.drain()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--latency', choices=['fixed', 'uniform', 'exponential', 'lognormal'], default='fixed')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--payload-size', type=int, default=1256)
+    parser.add_argument('--slow-loris-rate', type=float, default=0)
+    parser.add_argument('--drip-interval-ms', type=float, default=100)
+
+
+def config_from_arguments(args: argparse.Namespace) -> OriginConfig:
+    return OriginConfig(args.latency, args.latency_ms, args.jitter_ms, args.error_rate,
+                        args.payload_size, args.slow_loris_rate, args.drip_interval_ms)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for www.example.com.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    origin = OriginServer(config_from_arguments(args), args.host, args.port)
+    print(f'Serving on {origin.url}, run the listings with ORIGIN_URL={origin.url}')
+    asyncio.run(origin.serve_forever())
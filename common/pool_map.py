@@ -0,0 +1,153 @@
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def _map_chunk(func: Callable, chunk: List[Any]) -> Tuple[List[Tuple[bool, Any]], float]:
+    # Runs in the worker. The time is measured here so that queueing and pickling don't count as cost.
+    start = time.perf_counter()
+    outcomes = []
+
+    for item in chunk:
+        try:
+            outcomes.append((True, func(item)))
+        except Exception as e:
+            outcomes.append((False, e))
+
+    return outcomes, time.perf_counter() - start
+
+
+class CostModel:
+    # Learns how many seconds one unit of cost takes, a unit being one item or one unit of the cost hint.
+    def __init__(self, smoothing: float = .3):
+        self.smoothing = smoothing
+        self.seconds_per_unit: Optional[float] = None
+
+    def observe(self, units: float, seconds: float) -> None:
+        if units <= 0:
+            return
+
+        rate = seconds / units
+        if self.seconds_per_unit is None:
+            self.seconds_per_unit = rate
+        else:
+            self.seconds_per_unit += self.smoothing * (rate - self.seconds_per_unit)
+
+    def budget(self, target_seconds: float) -> float:
+        # Until something has been measured every chunk is a single item.
+        if not self.seconds_per_unit:
+            return 0.0
+        return target_seconds / self.seconds_per_unit
+
+
+async def pool_map(executor: Executor,
+                   func: Callable,
+                   items: Iterable[Any],
+                   cost: Optional[Callable[[Any], float]] = None,
+                   ordered: bool = True,
+                   target_seconds: float = .05,
+                   max_in_flight: Optional[int] = None) -> AsyncIterator[Tuple[Any, Any]]:
+    # Streams (item, result) pairs, in input order when ordered is set or as chunks complete otherwise.
+    # Items are shipped in chunks sized so each takes about target_seconds, from the per item cost
+    # observed so far. With a cost hint the most expensive items are scheduled first, which keeps one
+    # long job from starting last and stretching the whole batch.
+    loop = asyncio.get_running_loop()
+    items = list(items)
+    workers = getattr(executor, '_max_workers', None) or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+
+    costs = [cost(item) for item in items] if cost is not None else [1.0] * len(items)
+    order = sorted(range(len(items)), key=costs.__getitem__, reverse=True) if cost is not None \
+        else list(range(len(items)))
+
+    model = CostModel()
+    position = 0
+
+    def next_chunk() -> List[int]:
+        nonlocal position
+
+        budget = model.budget(target_seconds)
+        # Never put more than a fair share of what is left in one chunk, so the tail stays balanced.
+        limit = max(1, math.ceil((len(order) - position) / workers))
+        chunk = [order[position]]
+        units = costs[order[position]]
+
+        while len(chunk) < limit and position + len(chunk) < len(order):
+            candidate = order[position + len(chunk)]
+            if units + costs[candidate] > budget:
+                break
+            chunk.append(candidate)
+            units += costs[candidate]
+
+        position += len(chunk)
+        return chunk
+
+    in_flight: Dict[asyncio.Future, List[int]] = {}
+    finished: Dict[int, Tuple[bool, Any]] = {}
+    next_index = 0
+
+    try:
+        while position < len(order) or in_flight:
+            while position < len(order) and len(in_flight) < max_in_flight:
+                chunk = next_chunk()
+                job = loop.run_in_executor(executor, _map_chunk, func, [items[index] for index in chunk])
+                in_flight[job] = chunk
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+            for job in done:
+                chunk = in_flight.pop(job)
+                outcomes, seconds = job.result()
+                model.observe(sum(costs[index] for index in chunk), seconds)
+
+                if not ordered:
+                    for index, (ok, value) in zip(chunk, outcomes):
+                        if not ok:
+                            raise value
+                        yield items[index], value
+                else:
+                    finished.update(zip(chunk, outcomes))
+
+            # Release every result whose predecessors have all arrived.
+            while next_index in finished:
+                ok, value = finished.pop(next_index)
+                if not ok:
+                    raise value
+                yield items[next_index], value
+                next_index += 1
+    finally:
+        for job in in_flight:
+            job.cancel()
+
+
+def count(count_to: int) -> int:
+    counter = 0
+    while counter < count_to:
+        counter += 1
+
+    return counter
+
+
+if __name__ == '__main__':
+    from concurrent.futures import ProcessPoolExecutor
+
+    async def main():
+        # Listing 6.5's numbers plus a long tail of small jobs.
+        numbers = [1, 3, 5, 22, 20000000] + [10000] * 2000
+
+        with ProcessPoolExecutor() as process_pool:
+            loop = asyncio.get_running_loop()
+
+            start = time.perf_counter()
+            await asyncio.gather(*[loop.run_in_executor(process_pool, count, number) for number in numbers])
+            print(f'One run_in_executor per item: {time.perf_counter() - start:.4f} second(s)')
+
+            start = time.perf_counter()
+            results = [result async for _, result in pool_map(process_pool, count, numbers, cost=lambda n: n)]
+            print(f'pool_map, longest first: {time.perf_counter() - start:.4f} second(s)')
+            assert results == numbers
+
+    asyncio.run(main())
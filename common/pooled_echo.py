@@ -0,0 +1,193 @@
+import argparse
+import os
+import selectors
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+
+class PooledEchoServer:
+    # Instead of a ClientEchoThread per client (Listing 7.2), one selector thread watches every
+    # connection and hands the ones that are ready to read to a fixed number of worker threads.
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: int = 8000,
+                 workers: int = 16,
+                 max_connections: int = 10000,
+                 max_queued: int = 1000,
+                 send_timeout: float = 5):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen(1024)
+        self.server.setblocking(False)
+        self.address = self.server.getsockname()
+
+        self.max_connections = max_connections
+        self.max_queued = max_queued
+        self.send_timeout = send_timeout
+        self.rejected = 0
+        self.timed_out = 0
+
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._workers = workers
+        self._selector = selectors.DefaultSelector()
+        self._clients: Dict[int, socket.socket] = {}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._running = False
+
+        # Workers hand finished sockets back through this list and wake the selector with the socket pair.
+        self._ready_again: List[Tuple[socket.socket, bool]] = []
+        self._wakeup_read, self._wakeup_write = socket.socketpair()
+        self._wakeup_read.setblocking(False)
+        self._wakeup_write.setblocking(False)
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._clients)
+
+    def serve_forever(self) -> None:
+        self._running = True
+        self._selector.register(self.server, selectors.EVENT_READ)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+
+        try:
+            while self._running:
+                for key, _ in self._selector.select(timeout=1):
+                    if key.fileobj is self.server:
+                        self._accept()
+                    elif key.fileobj is self._wakeup_read:
+                        self._rearm()
+                    else:
+                        self._dispatch(key.fileobj)
+        except KeyboardInterrupt:
+            print('Shutting down')
+        finally:
+            self.close()
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake()
+
+    def _saturated(self) -> bool:
+        with self._lock:
+            return self._in_flight >= self._workers + self.max_queued
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except BlockingIOError:
+                return
+
+            # Admission control: turn new clients away instead of queueing more work than we can serve.
+            if len(self._clients) >= self.max_connections or self._saturated():
+                self.rejected += 1
+                try:
+                    connection.sendall(b'Server busy!')
+                except OSError:
+                    pass
+                connection.close()
+                continue
+
+            # Workers block on the socket, but never for longer than send_timeout: a client that sends
+            # without reading its echoes would otherwise hold a worker forever once its buffer fills.
+            connection.settimeout(self.send_timeout)
+            self._clients[connection.fileno()] = connection
+            self._selector.register(connection, selectors.EVENT_READ)
+
+    def _dispatch(self, connection: socket.socket) -> None:
+        # Stop watching the socket while a worker owns it, so it is never handled twice at once.
+        self._selector.unregister(connection)
+
+        with self._lock:
+            self._in_flight += 1
+
+        self._pool.submit(self._handle, connection)
+
+    def _handle(self, connection: socket.socket) -> None:
+        keep_open = True
+        timed_out = False
+
+        try:
+            data = connection.recv(2048)
+
+            # If there is no data the client closed the connection.
+            if not data:
+                keep_open = False
+            else:
+                connection.sendall(data)
+        except socket.timeout:
+            timed_out = True
+            keep_open = False
+        except OSError:
+            keep_open = False
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.timed_out += timed_out
+                self._ready_again.append((connection, keep_open))
+
+            self._wake()
+
+    def _wake(self) -> None:
+        try:
+            self._wakeup_write.send(b'\0')
+        except BlockingIOError:
+            # The selector is already going to wake up.
+            pass
+
+    def _rearm(self) -> None:
+        try:
+            while self._wakeup_read.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        with self._lock:
+            ready, self._ready_again = self._ready_again, []
+
+        for connection, keep_open in ready:
+            if keep_open and self._running:
+                self._selector.register(connection, selectors.EVENT_READ)
+            else:
+                self._clients.pop(connection.fileno(), None)
+                connection.close()
+
+    def close(self) -> None:
+        self._running = False
+        self._selector.unregister(self.server)
+        self.server.close()
+
+        # Same goodbye as ClientEchoThread.close, sent to every client that is still connected.
+        for connection in list(self._clients.values()):
+            try:
+                connection.sendall(bytes('Shutting down!', encoding='utf-8'))
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        self._pool.shutdown(wait=True)
+
+        for connection in self._clients.values():
+            connection.close()
+
+        self._clients.clear()
+        self._selector.close()
+        self._wakeup_read.close()
+        self._wakeup_write.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Echo server backed by a fixed size thread pool.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=min(32, (os.cpu_count() or 1) * 4))
+    parser.add_argument('--max-connections', type=int, default=10000)
+    parser.add_argument('--send-timeout', type=float, default=5)
+    args = parser.parse_args()
+
+    PooledEchoServer(args.host, args.port, args.workers, args.max_connections,
+                     send_timeout=args.send_timeout).serve_forever()
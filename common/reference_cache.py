@@ -0,0 +1,237 @@
+import asyncio
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import asyncpg
+from asyncpg import Connection, Record
+
+from common.database import SKUS_WITH_PRODUCT, Database
+
+# Table -> (key column, name column). All three are small and read far more often than they are written.
+REFERENCE_TABLES = {
+    'brand': ('brand_id', 'brand_name'),
+    'product_color': ('product_color_id', 'product_color_name'),
+    'product_size': ('product_size_id', 'product_size_name'),
+}
+
+NOTIFY_CHANNEL = 'reference_table_changed'
+
+CREATE_NOTIFY_FUNCTION = \
+    f"""
+    CREATE OR REPLACE FUNCTION notify_reference_table_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('{NOTIFY_CHANNEL}', TG_TABLE_NAME);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """
+
+CREATE_NOTIFY_TRIGGER = \
+    """
+    DROP TRIGGER IF EXISTS {table}_changed ON {table};
+    CREATE TRIGGER {table}_changed AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE PROCEDURE notify_reference_table_changed();
+    """
+
+
+async def install_triggers(database: Database, tables: Iterable[str] = REFERENCE_TABLES) -> None:
+    # One notification per write statement, carrying the table name, so caches know what to reload.
+    async with database.connection() as connection:
+        async with connection.transaction():
+            await connection.execute(CREATE_NOTIFY_FUNCTION)
+            for table in tables:
+                await connection.execute(CREATE_NOTIFY_TRIGGER.format(table=table))
+
+
+class ReferenceCache:
+    def __init__(self,
+                 database: Database,
+                 tables: Optional[Dict[str, Tuple[str, str]]] = None,
+                 listen: bool = True,
+                 poll_interval: Optional[float] = 60):
+        self.database = database
+        self.tables = tables or REFERENCE_TABLES
+        self.listen = listen
+        # Polling is the fallback when LISTEN is unavailable (e.g. behind a transaction pooler) and a
+        # safety net for notifications missed while the listening connection was down.
+        self.poll_interval = poll_interval
+
+        self.hits: Dict[str, int] = {table: 0 for table in self.tables}
+        self.misses: Dict[str, int] = {table: 0 for table in self.tables}
+        self.reloads = 0
+        self.loaded_at: Dict[str, float] = {}
+        self._names: Dict[str, Dict[Any, str]] = {table: {} for table in self.tables}
+        self._listener: Optional[Connection] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._reload_tasks: Dict[str, asyncio.Task] = {}
+        self._dirty: Set[str] = set()
+        self._releases: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        await self.reload()
+
+        if self.listen:
+            await self._start_listening()
+
+        if self.poll_interval:
+            self._poll_task = asyncio.create_task(self._poll_forever())
+
+    async def close(self) -> None:
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+
+        for task in self._reload_tasks.values():
+            task.cancel()
+
+        await self._stop_listening()
+        await asyncio.gather(*self._releases, return_exceptions=True)
+
+    async def __aenter__(self) -> 'ReferenceCache':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _start_listening(self) -> None:
+        # The listener holds one pooled connection for as long as the cache runs.
+        try:
+            self._listener = await self.database.pool.acquire()
+            await self._listener.add_listener(NOTIFY_CHANNEL, self._on_notify)
+            self._listener.add_termination_listener(self._on_listener_terminated)
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+            await self._stop_listening()
+
+    async def _stop_listening(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+
+        try:
+            listener.remove_termination_listener(self._on_listener_terminated)
+            await listener.remove_listener(NOTIFY_CHANNEL, self._on_notify)
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+            pass
+        finally:
+            await self.database.pool.release(listener)
+
+    def _on_notify(self, connection: Connection, pid: int, channel: str, table: str) -> None:
+        if table in self.tables:
+            self._schedule_reload(table)
+
+    def _on_listener_terminated(self, connection: Connection) -> None:
+        # Hand the dead connection back, or the pool stays one slot short for good. The poller
+        # starts listening again on a fresh one.
+        if self._listener is connection:
+            self._listener = None
+            release = asyncio.ensure_future(self.database.pool.release(connection))
+            self._releases.add(release)
+            release.add_done_callback(self._releases.discard)
+
+        # Anything could have changed while nobody was listening.
+        for table in self.tables:
+            self._schedule_reload(table)
+
+    def _schedule_reload(self, table: str) -> None:
+        # A burst of notifications for one table collapses into a single reload. A notification during
+        # a reload marks the table dirty instead: that reload may have read it before the write
+        # committed, so it runs once more.
+        task = self._reload_tasks.get(table)
+        if task is None or task.done():
+            self._reload_tasks[table] = asyncio.create_task(self._reload_until_clean(table))
+        else:
+            self._dirty.add(table)
+
+    async def _reload_until_clean(self, table: str) -> None:
+        while True:
+            self._dirty.discard(table)
+            try:
+                await self.reload_table(table)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                # The poller catches up once the database is back.
+                return
+
+            if table not in self._dirty:
+                return
+
+    async def reload_table(self, table: str) -> None:
+        key, name = self.tables[table]
+        records = await self.database.fetch(f'SELECT {key}, {name} FROM {table}')
+        # Swap in a new dict rather than mutating, readers never see a half-loaded table.
+        self._names[table] = {record[key]: record[name] for record in records}
+        self.loaded_at[table] = time.time()
+        self.reloads += 1
+
+    async def reload(self) -> None:
+        await asyncio.gather(*[self.reload_table(table) for table in self.tables])
+
+    async def _poll_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if self._listener is None and self.listen:
+                await self._start_listening()
+            try:
+                await self.reload()
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                # Keep serving the last good copy until the database is back.
+                pass
+
+    def lookup(self, table: str, key: Any) -> Optional[str]:
+        # Never touches the database, for hot paths that can tolerate a missing name.
+        name = self._names[table].get(key)
+        if name is None:
+            self.misses[table] += 1
+        else:
+            self.hits[table] += 1
+        return name
+
+    async def get(self, table: str, key: Any) -> Optional[str]:
+        name = self.lookup(table, key)
+        if name is not None:
+            return name
+
+        # Read through: a row inserted after the last load is fetched once and kept.
+        key_column, name_column = self.tables[table]
+        name = await self.database.fetchval(
+            f'SELECT {name_column} FROM {table} WHERE {key_column} = $1', key
+        )
+        if name is not None:
+            self._names[table][key] = name
+        return name
+
+    async def decorate(self, records: Iterable[Record]) -> List[Dict[str, Any]]:
+        # Adds a *_name field for every reference table key present in the records, without a join.
+        decorated = []
+        for record in records:
+            row = dict(record)
+            for table, (key_column, name_column) in self.tables.items():
+                if key_column in row:
+                    row[name_column] = await self.get(table, row[key_column])
+            decorated.append(row)
+        return decorated
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'hits': dict(self.hits),
+            'misses': dict(self.misses),
+            'reloads': self.reloads,
+            'rows': {table: len(names) for table, names in self._names.items()},
+            'listening': self._listener is not None,
+        }
+
+
+if __name__ == '__main__':
+    async def main():
+        async with Database() as database:
+            await install_triggers(database)
+
+            async with ReferenceCache(database) as cache:
+                count = 0
+                async for batch in database.stream_batches(SKUS_WITH_PRODUCT, batch_size=5000):
+                    count += len(await cache.decorate(batch))
+
+                print(f'Decorated {count} skus')
+                print(cache.stats())
+
+    asyncio.run(main())
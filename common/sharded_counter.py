@@ -0,0 +1,212 @@
+import atexit
+import os
+import time
+from multiprocessing import Value
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Tuple
+
+CACHE_LINE = 64
+WORD = 8
+WORDS_PER_LINE = CACHE_LINE // WORD
+# The first line holds the snapshot epoch. Each slot then takes two lines: a live line with a sequence
+# number, the last epoch the writer saw and up to six counters, and a frozen line with its own sequence
+# number followed by a copy of those counters.
+MAX_FIELDS = WORDS_PER_LINE - 2
+EPOCH = 0
+
+
+class CounterSlot:
+    # The only writer of its cache lines, so an increment needs no lock and never bounces a line that
+    # another process is writing. The sequence number is odd while an update is in progress. Like any
+    # seqlock this relies on aligned 8 byte stores becoming visible in program order, as they do on x86.
+    def __init__(self, words: memoryview, index: int, fields: int):
+        self._words = words
+        self._seq = (1 + 2 * index) * WORDS_PER_LINE
+        self._seen = self._seq + 1
+        self._base = self._seq + 2
+        self._frozen_seq = self._seq + WORDS_PER_LINE
+        self._frozen = self._frozen_seq + 1
+        self.index = index
+        self.fields = fields
+
+    def _freeze(self) -> None:
+        # First update since a reader asked for a snapshot: keep the counters as they were at this point
+        # for the reader, then carry on updating the live ones. The frozen line has a sequence number of
+        # its own, because a newer snapshot can make us freeze again while a reader copies the last one.
+        words, frozen_seq = self._words, self._frozen_seq
+        epoch = words[EPOCH]
+        words[frozen_seq] += 1
+        words[self._frozen:self._frozen + self.fields] = words[self._base:self._base + self.fields]
+        words[self._seen] = epoch
+        words[frozen_seq] += 1
+
+    def add(self, amount: int = 1, field: int = 0) -> None:
+        words, seq = self._words, self._seq
+        words[seq] += 1
+        if words[self._seen] != words[EPOCH]:
+            self._freeze()
+        words[self._base + field] += amount
+        words[seq] += 1
+
+    def add_many(self, *amounts: int) -> None:
+        # Several related counters (say count and total bytes) updated as one.
+        words, seq, base = self._words, self._seq, self._base
+        words[seq] += 1
+        if words[self._seen] != words[EPOCH]:
+            self._freeze()
+        for field, amount in enumerate(amounts):
+            words[base + field] += amount
+        words[seq] += 1
+
+
+class ShardedCounter:
+    def __init__(self, slots: int, fields: int = 1):
+        if not 1 <= fields <= MAX_FIELDS:
+            raise ValueError(f'A slot holds between 1 and {MAX_FIELDS} fields')
+
+        self.slots = slots
+        self.fields = fields
+        size = (1 + 2 * slots) * CACHE_LINE
+        self._segment = SharedMemory(create=True, size=size)
+        self._segment.buf[:] = bytes(size)
+        self._words = self._segment.buf.cast('Q')
+        self._owner = os.getpid()
+        # Handing out slots is the only locked operation, once per worker rather than once per increment.
+        self._next_slot = Value('i', 0)
+        atexit.register(self.close)
+
+    def __getstate__(self):
+        # Pickled as a reference to the segment, for example in a pool initializer's initargs.
+        return self._segment.name, self.slots, self.fields, self._owner, self._next_slot
+
+    def __setstate__(self, state):
+        name, self.slots, self.fields, self._owner, self._next_slot = state
+        self._segment = SharedMemory(name=name)
+        self._words = self._segment.buf.cast('Q')
+
+    @property
+    def name(self) -> str:
+        return self._segment.name
+
+    def slot(self, index: int) -> CounterSlot:
+        if not 0 <= index < self.slots:
+            raise IndexError(f'Slot {index} out of range for {self.slots} slots')
+        return CounterSlot(self._words, index, self.fields)
+
+    def claim(self) -> CounterSlot:
+        with self._next_slot.get_lock():
+            index = self._next_slot.value
+            self._next_slot.value += 1
+        return self.slot(index)
+
+    def value(self, field: int = 0) -> int:
+        # Cheap and lock free. Counters only grow, so the sum lies between the true totals at the start
+        # and at the end of the read, but the slots are not read at one point in time.
+        words = self._words
+        return sum(words[(1 + 2 * index) * WORDS_PER_LINE + 2 + field] for index in range(self.slots))
+
+    def _read_slot(self, index: int, epoch: int) -> Optional[Tuple[int, ...]]:
+        words = self._words
+        seq = (1 + 2 * index) * WORDS_PER_LINE
+        frozen_seq = seq + WORDS_PER_LINE
+        frozen_start = words[frozen_seq]
+        start = words[seq]
+
+        seen = words[seq + 1]
+        if seen >= epoch:
+            # The writer froze its counters when it first saw our epoch. They only change again if another
+            # reader starts a newer snapshot, and then the frozen sequence number moves while we copy.
+            if frozen_start & 1:
+                return None
+            values = tuple(words[frozen_seq + 1:frozen_seq + 1 + self.fields])
+            if words[frozen_seq] != frozen_start or words[seq + 1] != seen:
+                return None
+            return values
+
+        values = tuple(words[seq + 2:seq + 2 + self.fields])
+        if start & 1 or words[seq] != start or words[seq + 1] >= epoch:
+            # Mid update, try again: a busy writer will freeze on its next update.
+            return None
+        return values
+
+    def snapshot(self, timeout: float = 1.0) -> List[Tuple[int, ...]]:
+        # Starting a new epoch marks the snapshot. Every slot is taken at one point of its writer's
+        # history after that mark, either frozen by the writer itself or read while it is idle, and the
+        # fields of a slot are always consistent with each other. Writers never wait for the reader.
+        epoch = self._words[EPOCH] + 1
+        self._words[EPOCH] = epoch
+
+        values: List[Optional[Tuple[int, ...]]] = [None] * self.slots
+        pending = list(range(self.slots))
+        # A live writer finishes an update in well under a microsecond. One that died part way through
+        # leaves its sequence number odd for good, so give up instead of spinning forever.
+        deadline = time.monotonic() + timeout
+
+        while pending:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'Slots {pending} stayed mid update for {timeout} second(s), '
+                                   f'did their writer die?')
+
+            still_pending = []
+            for index in pending:
+                values[index] = self._read_slot(index, epoch)
+                if values[index] is None:
+                    still_pending.append(index)
+            pending = still_pending
+
+        return values
+
+    def totals(self, timeout: float = 1.0) -> Tuple[int, ...]:
+        return tuple(sum(column) for column in zip(*self.snapshot(timeout)))
+
+    def close(self) -> None:
+        if self._segment is None:
+            return
+
+        self._words.release()
+        self._segment.close()
+        if os.getpid() == self._owner:
+            self._segment.unlink()
+        self._segment = None
+
+
+def increment_locked(counter, increments: int) -> None:
+    # Listing 6.12's pattern: every process serializes on the counter's lock for every increment.
+    for _ in range(increments):
+        with counter.get_lock():
+            counter.value += 1
+
+
+def increment_sharded(counter: ShardedCounter, increments: int) -> None:
+    slot = counter.claim()
+    for _ in range(increments):
+        slot.add()
+
+
+if __name__ == '__main__':
+    import argparse
+    from multiprocessing import Process
+
+    def run(target, counter, processes: int, increments: int) -> float:
+        workers = [Process(target=target, args=(counter, increments)) for _ in range(processes)]
+        start = time.perf_counter()
+        [worker.start() for worker in workers]
+        [worker.join() for worker in workers]
+        return time.perf_counter() - start
+
+    parser = argparse.ArgumentParser(description='Locked Value versus sharded counter increments.')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--increments', type=int, default=1000000)
+    args = parser.parse_args()
+    expected = args.processes * args.increments
+
+    locked = Value('q', 0)
+    elapsed = run(increment_locked, locked, args.processes, args.increments)
+    print(f'Locked Value: {locked.value} of {expected} in {elapsed:.4f} second(s), '
+          f'{expected / elapsed:,.0f} increments/s')
+
+    sharded = ShardedCounter(args.processes)
+    elapsed = run(increment_sharded, sharded, args.processes, args.increments)
+    print(f'Sharded counter: {sharded.totals()[0]} of {expected} in {elapsed:.4f} second(s), '
+          f'{expected / elapsed:,.0f} increments/s')
+    sharded.close()
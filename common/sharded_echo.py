@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import functools
+import os
+import queue
+import signal
+import socket
+import time
+from multiprocessing import Process, Queue
+from multiprocessing.connection import wait
+from typing import Dict, Optional
+
+from Chapter3.Listing_3_8 import echo
+
+STATS_INTERVAL = 1.0
+RESTART_DELAY = .5
+
+
+def create_reuseport_socket(host: str, port: int) -> socket.socket:
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        raise RuntimeError('SO_REUSEPORT is not available on this platform')
+
+    # Every worker binds the same port, the kernel spreads incoming connections between them.
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server_socket.setblocking(False)
+    server_socket.bind((host, port))
+    server_socket.listen(1024)
+    return server_socket
+
+
+class WorkerStats:
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.accepted = 0
+        self.active = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {'worker_id': self.worker_id, 'pid': os.getpid(), 'accepted': self.accepted, 'active': self.active}
+
+
+async def report_stats(stats: WorkerStats, stats_queue: Queue) -> None:
+    while True:
+        await asyncio.sleep(STATS_INTERVAL)
+        stats_queue.put_nowait(stats.as_dict())
+
+
+async def serve(worker_id: int, host: str, port: int, stats_queue: Queue) -> None:
+    loop = asyncio.get_running_loop()
+    server_socket = create_reuseport_socket(host, port)
+    stats = WorkerStats(worker_id)
+    reporter = asyncio.create_task(report_stats(stats, stats_queue))
+    connections = set()
+
+    def connection_closed(connection: socket.socket, task: asyncio.Task) -> None:
+        connections.discard(task)
+        stats.active -= 1
+
+        # A client resetting the connection is routine for an echo server. Retrieve the error so it is not
+        # reported as never retrieved, and close the socket, which echo leaves open.
+        if not task.cancelled():
+            task.exception()
+        connection.close()
+
+    try:
+        while True:
+            connection, _ = await loop.sock_accept(server_socket)
+            connection.setblocking(False)
+            stats.accepted += 1
+            stats.active += 1
+
+            # The same echo coroutine as Listing 3.8, one task per connection on this worker's loop.
+            task = asyncio.create_task(echo(connection, loop))
+            connections.add(task)
+            task.add_done_callback(functools.partial(connection_closed, connection))
+    finally:
+        reporter.cancel()
+        server_socket.close()
+
+
+def run_worker(worker_id: int, host: str, port: int, stats_queue: Queue) -> None:
+    # The supervisor decides when workers stop, so ignore the Ctrl+C sent to the whole process group.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(serve(worker_id, host, port, stats_queue))
+
+
+class Supervisor:
+    def __init__(self, workers: int, host: str = '127.0.0.1', port: int = 8000):
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.restarts = 0
+        self.stats: Dict[int, Dict[str, int]] = {}
+        self._stats_queue: Queue = Queue()
+        self._processes: Dict[int, Process] = {}
+        self._running = False
+
+    def _start_worker(self, worker_id: int) -> None:
+        process = Process(target=run_worker, args=(worker_id, self.host, self.port, self._stats_queue), daemon=True)
+        process.start()
+        self._processes[worker_id] = process
+
+    def _drain_stats(self) -> None:
+        while True:
+            try:
+                worker_stats = self._stats_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            self.stats[worker_stats['worker_id']] = worker_stats
+
+    def totals(self) -> Dict[str, int]:
+        return {
+            'workers': len(self._processes),
+            'restarts': self.restarts,
+            'accepted': sum(stats['accepted'] for stats in self.stats.values()),
+            'active': sum(stats['active'] for stats in self.stats.values()),
+        }
+
+    def run(self, report_every: Optional[float] = 5.0) -> None:
+        self._running = True
+        last_report = time.monotonic()
+
+        for worker_id in range(self.workers):
+            self._start_worker(worker_id)
+
+        try:
+            while self._running:
+                sentinels = {process.sentinel: worker_id for worker_id, process in self._processes.items()}
+
+                for sentinel in wait(list(sentinels), timeout=STATS_INTERVAL):
+                    worker_id = sentinels[sentinel]
+                    crashed = self._processes[worker_id]
+                    crashed.join()
+                    print(f'Worker {worker_id} exited with {crashed.exitcode}, restarting')
+                    self.restarts += 1
+                    self.stats.pop(worker_id, None)
+                    time.sleep(RESTART_DELAY)
+                    self._start_worker(worker_id)
+
+                self._drain_stats()
+
+                if report_every is not None and time.monotonic() - last_report >= report_every:
+                    print(self.totals())
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            print('Shutting down')
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._running = False
+
+        for process in self._processes.values():
+            process.terminate()
+
+        for process in self._processes.values():
+            process.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Echo server sharded over one event loop per core.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    Supervisor(args.workers, args.host, args.port).run()
@@ -0,0 +1,433 @@
+import asyncio
+import importlib
+import itertools
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+
+class WorkerDied(RuntimeError):
+    pass
+
+
+class TaskTimeout(asyncio.TimeoutError):
+    pass
+
+
+def idempotent(func: Callable) -> Callable:
+    # Marks a module level function as safe to run again when its worker dies part way through.
+    func.__idempotent__ = True
+    return func
+
+
+def _rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current RSS, but it still catches a worker that keeps growing.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _worker_main(connection: Connection,
+                 preload: Sequence[str],
+                 max_tasks: Optional[int],
+                 max_rss: Optional[int]) -> None:
+    # Already imported in the fork server, this only matters for the fork and spawn contexts.
+    for module in preload:
+        importlib.import_module(module)
+
+    tasks = 0
+
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            return
+
+        if message is None:
+            return
+
+        task_id, func, args, kwargs = message
+        try:
+            ok, value = True, func(*args, **kwargs)
+        except Exception as e:
+            ok, value = False, e
+
+        tasks += 1
+        rss = _rss_bytes()
+        # The worker decides to retire itself, after sending its last result.
+        retire = (max_tasks is not None and tasks >= max_tasks) or (max_rss is not None and rss >= max_rss)
+
+        try:
+            connection.send((task_id, ok, value, rss, retire))
+        except (EOFError, OSError):
+            return
+        except Exception as e:
+            # The result or exception could not be pickled.
+            connection.send((task_id, False, RuntimeError(f'Unpicklable result: {e!r}'), rss, retire))
+
+        if retire:
+            return
+
+
+# Workers are started from executor threads. Without this lock a worker forked while another one is being
+# started inherits that sibling's child pipe end and sentinel, and keeps them open for its whole life.
+_start_lock = threading.Lock()
+
+
+class _Task:
+    __slots__ = ('id', 'func', 'args', 'kwargs', 'future', 'timeout', 'idempotent', 'attempts', 'timer')
+
+    def __init__(self,
+                 task_id: int,
+                 func: Callable,
+                 args: tuple,
+                 kwargs: dict,
+                 future: asyncio.Future,
+                 timeout: Optional[float],
+                 idempotent: bool):
+        self.id = task_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.timeout = timeout
+        self.idempotent = idempotent
+        self.attempts = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class _Worker:
+    def __init__(self, process: multiprocessing.Process, connection: Connection):
+        self.process = process
+        self.connection = connection
+        self.pid = process.pid
+        self.tasks = 0
+        self.rss = 0
+        self.task: Optional[_Task] = None
+        self.started_at = time.monotonic()
+        self.busy_since: Optional[float] = None
+        self.busy_seconds = 0.0
+
+    def utilization(self, now: float) -> float:
+        busy = self.busy_seconds + (now - self.busy_since if self.busy_since is not None else 0.0)
+        lifetime = now - self.started_at
+        return busy / lifetime if lifetime > 0 else 0.0
+
+
+class WorkerPool:
+    # Long-lived workers forked from a fork server that has already imported the preload modules, so
+    # neither process startup nor imports are paid per job. A worker is replaced once it has run
+    # max_tasks_per_worker tasks or its RSS reaches max_rss_bytes, which bounds leaks and fragmentation.
+    # A task running longer than its timeout gets its worker killed and replaced, and idempotent tasks
+    # whose worker dies are retried up to max_retries times, so one bad input costs one worker restart
+    # instead of the pool.
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 preload: Sequence[str] = (),
+                 max_tasks_per_worker: Optional[int] = 10000,
+                 max_rss_bytes: Optional[int] = None,
+                 task_timeout: Optional[float] = None,
+                 max_retries: int = 2,
+                 context: str = 'forkserver'):
+        self.workers = workers or os.cpu_count() or 1
+        self.preload = list(preload)
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_rss_bytes = max_rss_bytes
+        self.task_timeout = task_timeout
+        self.max_retries = max_retries
+        self.context_name = context
+
+        self.completed = 0
+        self.recycled = 0
+        self.died = 0
+        self.timeouts = 0
+        self.retries = 0
+        self._context = multiprocessing.get_context(context)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count()
+        self._workers: Dict[int, _Worker] = {}
+        self._idle: List[_Worker] = []
+        self._pending: Deque[_Task] = deque()
+        self._spawning: Set[asyncio.Task] = set()
+        self._closed = False
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if self.context_name == 'forkserver':
+            self._context.set_forkserver_preload(self.preload)
+        await asyncio.gather(*[self._spawn() for _ in range(self.workers)])
+
+    async def close(self) -> None:
+        self._closed = True
+
+        # Let queued and running tasks finish before the workers are told to exit.
+        futures = [task.future for task in self._pending]
+        futures += [worker.task.future for worker in self._workers.values() if worker.task is not None]
+        await asyncio.gather(*futures, return_exceptions=True)
+        await asyncio.gather(*self._spawning, return_exceptions=True)
+
+        exits = []
+        for worker in list(self._workers.values()):
+            try:
+                worker.connection.send(None)
+            except OSError:
+                pass
+            exits.append(self._forget(worker))
+
+        await asyncio.gather(*exits)
+
+    async def __aenter__(self) -> 'WorkerPool':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def submit(self, func: Callable, *args, **kwargs) -> Any:
+        return await self.submit_with(func, args, kwargs)
+
+    async def submit_with(self,
+                          func: Callable,
+                          args: tuple = (),
+                          kwargs: Optional[dict] = None,
+                          timeout: Optional[float] = None,
+                          idempotent: Optional[bool] = None) -> Any:
+        # Like submit, with a per call timeout and retry policy instead of the pool's defaults.
+        if self._closed:
+            raise RuntimeError('Pool is closed')
+
+        task = _Task(
+            next(self._ids), func, args, kwargs or {}, self._loop.create_future(),
+            timeout if timeout is not None else self.task_timeout,
+            idempotent if idempotent is not None else getattr(func, '__idempotent__', False),
+        )
+        self._pending.append(task)
+        self._dispatch()
+        return await task.future
+
+    async def map(self, func: Callable, items: Sequence[Any]) -> List[Any]:
+        return await asyncio.gather(*[self.submit(func, item) for item in items])
+
+    def _start_process(self) -> Tuple[multiprocessing.Process, Connection]:
+        with _start_lock:
+            parent, child = self._context.Pipe()
+            process = self._context.Process(
+                target=_worker_main,
+                args=(child, self.preload, self.max_tasks_per_worker, self.max_rss_bytes),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+
+        return process, parent
+
+    async def _spawn(self) -> None:
+        # Talking to the fork server is a blocking round trip, keep it off the event loop.
+        process, parent = await self._loop.run_in_executor(None, self._start_process)
+
+        worker = _Worker(process, parent)
+        self._workers[worker.pid] = worker
+        self._loop.add_reader(parent.fileno(), self._on_readable, worker)
+        # Pipe EOF alone is not enough: any process that still holds the worker's end of the pipe, such
+        # as a subprocess the task started, hides it. The sentinel becomes readable when the worker exits.
+        self._loop.add_reader(process.sentinel, self._on_sentinel, worker)
+        self._idle.append(worker)
+        self._dispatch()
+
+    def _replace(self) -> None:
+        if self._closed and not self._pending:
+            return
+
+        spawn = asyncio.ensure_future(self._spawn())
+        self._spawning.add(spawn)
+        spawn.add_done_callback(self._spawning.discard)
+
+    def _forget(self, worker: _Worker) -> asyncio.Future:
+        self._loop.remove_reader(worker.connection.fileno())
+        self._loop.remove_reader(worker.process.sentinel)
+        worker.connection.close()
+        self._workers.pop(worker.pid, None)
+        if worker in self._idle:
+            self._idle.remove(worker)
+        # Reap the process without blocking the loop.
+        return self._loop.run_in_executor(None, worker.process.join)
+
+    def _dispatch(self) -> None:
+        while self._pending and self._idle:
+            task = self._pending.popleft()
+            if task.future.done():
+                continue
+
+            # The most recently used worker has the warmest caches.
+            worker = self._idle.pop()
+            worker.task = task
+            worker.busy_since = time.monotonic()
+
+            try:
+                worker.connection.send((task.id, task.func, task.args, task.kwargs))
+            except OSError:
+                # The worker is gone, its reader will see EOF. Put the task back for another worker.
+                worker.task = None
+                self._pending.appendleft(task)
+                continue
+            except Exception as e:
+                # The task itself could not be pickled.
+                worker.task = None
+                self._idle.append(worker)
+                task.future.set_exception(e)
+                continue
+
+            if task.timeout is not None:
+                task.timer = self._loop.call_later(task.timeout, self._on_timeout, worker, task)
+
+    def _finish_task(self, worker: _Worker) -> Optional[_Task]:
+        task, worker.task = worker.task, None
+        if task is not None and task.timer is not None:
+            task.timer.cancel()
+            task.timer = None
+        if worker.busy_since is not None:
+            worker.busy_seconds += time.monotonic() - worker.busy_since
+            worker.busy_since = None
+        return task
+
+    def _on_readable(self, worker: _Worker) -> None:
+        try:
+            task_id, ok, value, rss, retire = worker.connection.recv()
+        except (EOFError, OSError):
+            self._on_worker_exit(worker)
+            return
+
+        task = self._finish_task(worker)
+        worker.tasks += 1
+        worker.rss = rss
+        self.completed += 1
+
+        if task is not None and not task.future.done():
+            if ok:
+                task.future.set_result(value)
+            else:
+                task.future.set_exception(value)
+
+        if retire:
+            self.recycled += 1
+            self._forget(worker)
+            self._replace()
+        else:
+            self._idle.append(worker)
+            self._dispatch()
+
+    def _on_sentinel(self, worker: _Worker) -> None:
+        # Deliver anything the worker sent before exiting, such as the last result of a retiring worker.
+        while self._workers.get(worker.pid) is worker and worker.connection.poll():
+            self._on_readable(worker)
+
+        if self._workers.get(worker.pid) is worker:
+            self._on_worker_exit(worker)
+
+    def _on_worker_exit(self, worker: _Worker) -> None:
+        task = self._finish_task(worker)
+        self.died += 1
+        self._forget(worker)
+
+        if task is not None and not task.future.done():
+            if task.idempotent and task.attempts < self.max_retries:
+                # Run it next, on another worker, rather than behind everything queued since.
+                task.attempts += 1
+                self.retries += 1
+                self._pending.appendleft(task)
+            else:
+                task.future.set_exception(WorkerDied(f'Worker {worker.pid} exited while running task {task.id}'))
+
+        self._replace()
+        self._dispatch()
+
+    def _on_timeout(self, worker: _Worker, task: _Task) -> None:
+        if worker.task is not task:
+            return
+
+        # A task that hung once would most likely hang again, so it fails rather than being retried.
+        self._finish_task(worker)
+        self.timeouts += 1
+        worker.process.kill()
+        self._forget(worker)
+
+        if not task.future.done():
+            task.future.set_exception(TaskTimeout(f'Task {task.id} ran longer than {task.timeout} second(s)'))
+
+        self._replace()
+
+    def stats(self) -> Dict[str, Any]:
+        # Utilization is the share of its lifetime a worker spent running tasks.
+        now = time.monotonic()
+        utilizations = {worker.pid: worker.utilization(now) for worker in self._workers.values()}
+
+        return {
+            'workers': len(self._workers),
+            'idle': len(self._idle),
+            'pending': len(self._pending),
+            'completed': self.completed,
+            'recycled': self.recycled,
+            'died': self.died,
+            'timeouts': self.timeouts,
+            'retries': self.retries,
+            'utilization': sum(utilizations.values()) / len(utilizations) if utilizations else 0.0,
+            'per_worker': {worker.pid: {'tasks': worker.tasks,
+                                        'rss_bytes': worker.rss,
+                                        'busy': worker.task is not None,
+                                        'utilization': utilizations[worker.pid]}
+                           for worker in self._workers.values()},
+        }
+
+
+def say_hello(name: str) -> str:
+    return f'Hi there, {name}'
+
+
+@idempotent
+def count(count_to: int) -> int:
+    counter = 0
+    while counter < count_to:
+        counter += 1
+
+    return counter
+
+
+if __name__ == '__main__':
+    from multiprocessing import Pool
+
+    async def main():
+        rounds = 20
+
+        # Listings 6.2 and 6.3 start a new pool for every run.
+        start = time.perf_counter()
+        for _ in range(rounds):
+            with Pool() as process_pool:
+                process_pool.apply(say_hello, args=('Jeff',))
+        print(f'New Pool per call: {(time.perf_counter() - start) / rounds * 1000:.3f} ms per call')
+
+        async with WorkerPool(preload=['common.kernels'], max_tasks_per_worker=500) as pool:
+            await pool.submit(say_hello, 'Jeff')
+
+            calls = 1000
+            start = time.perf_counter()
+            for _ in range(calls):
+                await pool.submit(say_hello, 'Jeff')
+            print(f'Warm WorkerPool: {(time.perf_counter() - start) / calls * 1000:.3f} ms per call')
+
+            results = await pool.map(say_hello, [f'worker {index}' for index in range(5000)])
+            print(f'{len(results)} calls, {pool.stats()}')
+
+            # Listing 6.5 with one count that would take hours: its worker is killed and replaced
+            # while the other counts carry on.
+            counts = [pool.submit_with(count, (number,), timeout=5) for number in [1, 3, 5, 22, 10 ** 11]]
+            print(await asyncio.gather(*counts, return_exceptions=True))
+            print(pool.stats())
+
+    asyncio.run(main())
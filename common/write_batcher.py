@@ -0,0 +1,170 @@
+import asyncio
+import random
+import time
+from asyncio import Future, Queue
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from asyncpg import Connection
+
+from common.database import Database
+
+# serialization_failure and deadlock_detected: the transaction did nothing wrong, it just lost a race.
+RETRYABLE_SQLSTATES = {'40001', '40P01'}
+
+Write = Callable[[Connection], Awaitable[Any]]
+
+
+def is_retryable(error: BaseException) -> bool:
+    return getattr(error, 'sqlstate', None) in RETRYABLE_SQLSTATES
+
+
+class WriteBatcher:
+    # Group commit: small writes submitted by many callers are collected for at most max_latency seconds
+    # (or until max_batch of them arrive) and committed together in one transaction. Each write runs in
+    # its own savepoint, so a bad row only fails its own caller.
+    def __init__(self,
+                 database: Database,
+                 max_batch: int = 100,
+                 max_latency: float = .005,
+                 max_retries: int = 5,
+                 base_delay: float = .01,
+                 isolation: str = 'read_committed'):
+        self.database = database
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.isolation = isolation
+
+        self.commits = 0
+        self.writes = 0
+        self.failed_writes = 0
+        self.retries = 0
+        self._started_at = time.perf_counter()
+        self._queue: Queue = Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._started_at = time.perf_counter()
+        self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        # Let everything already submitted commit before stopping.
+        await self._queue.join()
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    async def __aenter__(self) -> 'WriteBatcher':
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def submit(self, write: Write) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((write, future))
+        return await future
+
+    async def execute(self, query: str, *args) -> Any:
+        return await self.submit(lambda connection: connection.execute(query, *args))
+
+    async def _next_batch(self) -> List[Tuple[Write, Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_latency
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _commit(self, batch: List[Tuple[Write, Future]]) -> List[Tuple[Future, bool, Any]]:
+        outcomes = []
+
+        async with self.database.connection() as connection:
+            async with connection.transaction(isolation=self.isolation):
+                for write, future in batch:
+                    try:
+                        # A nested transaction is a savepoint, rolling it back keeps the rest of the batch.
+                        async with connection.transaction():
+                            outcomes.append((future, True, await write(connection)))
+                    except Exception as e:
+                        # Server errors, asyncpg's client side argument errors and plain bugs in the
+                        # callable all stay with their caller. Only a lost race retries the whole batch.
+                        if is_retryable(e):
+                            raise
+                        outcomes.append((future, False, e))
+
+        return outcomes
+
+    async def _commit_with_retries(self, batch: List[Tuple[Write, Future]]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                outcomes = await self._commit(batch)
+            except Exception as e:
+                if is_retryable(e) and attempt < self.max_retries:
+                    self.retries += 1
+                    # Full jitter, so batches that collided do not collide again on the retry.
+                    await asyncio.sleep(random.uniform(0, self.base_delay * 2 ** attempt))
+                    continue
+
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self.failed_writes += len(batch)
+                return
+
+            self.commits += 1
+            for future, ok, value in outcomes:
+                self.writes += 1
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    self.failed_writes += 1
+                    future.set_exception(value)
+            return
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._commit_with_retries(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def stats(self) -> Dict[str, float]:
+        elapsed = time.perf_counter() - self._started_at
+        return {
+            'commits': self.commits,
+            'writes': self.writes,
+            'failed_writes': self.failed_writes,
+            'retries': self.retries,
+            'commits_per_second': self.commits / elapsed if elapsed else 0.0,
+            'writes_per_second': self.writes / elapsed if elapsed else 0.0,
+        }
+
+
+if __name__ == '__main__':
+    async def main():
+        async with Database() as database, WriteBatcher(database) as batcher:
+            inserts = [batcher.execute('INSERT INTO brand VALUES(DEFAULT, $1)', f'brand_{index}')
+                       for index in range(1000)]
+            # Brand -1 does not exist, the foreign key violation rolls back only this write's savepoint.
+            inserts.append(batcher.execute("INSERT INTO product VALUES(DEFAULT, 'orphan', -1)"))
+
+            results = await asyncio.gather(*inserts, return_exceptions=True)
+            print(f'{sum(isinstance(result, Exception) for result in results)} of {len(results)} writes failed')
+            print(batcher.stats())
+
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# common lives in the repository root, one level above this folder.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.catalog_loader import CatalogNotEmpty, SqliteSink, load_catalog
+
+
+def count(sink: SqliteSink, query: str) -> int:
+    return sink.connection.execute(query).fetchone()[0]
+
+
+@pytest.mark.parametrize('method', ['copy', 'executemany'])
+def test_load_catalog_row_counts(method):
+    sink = SqliteSink()
+    try:
+        # A batch size that does not divide the row counts also exercises the last, partial batch.
+        report = asyncio.run(load_catalog(sink, brands=5, products=50, skus=300, batch_size=7, method=method))
+
+        assert report['brand']['rows'] == 5
+        assert report['product']['rows'] == 50
+        assert report['sku']['rows'] == 300
+        assert count(sink, 'SELECT COUNT(*) FROM brand') == 5
+        assert count(sink, 'SELECT COUNT(*) FROM product') == 50
+        assert count(sink, 'SELECT COUNT(*) FROM sku') == 300
+        assert count(sink, 'SELECT COUNT(*) FROM product_color') == 2
+        assert count(sink, 'SELECT COUNT(*) FROM product_size') == 3
+    finally:
+        sink.close()
+
+
+def test_load_catalog_foreign_keys():
+    sink = SqliteSink()
+    try:
+        asyncio.run(load_catalog(sink, brands=3, products=20, skus=100, batch_size=10))
+
+        assert sink.connection.execute('PRAGMA foreign_key_check').fetchall() == []
+        # Every SKU joins to a product, a size and a color, and every product to a brand.
+        assert count(sink, """
+            SELECT COUNT(*) FROM sku
+            JOIN product ON product.product_id = sku.product_id
+            JOIN brand ON brand.brand_id = product.brand_id
+            JOIN product_size ON product_size.product_size_id = sku.product_size_id
+            JOIN product_color ON product_color.product_color_id = sku.product_color_id
+        """) == 100
+    finally:
+        sink.close()
+
+
+def test_load_catalog_twice_fails_clearly():
+    sink = SqliteSink()
+    try:
+        asyncio.run(load_catalog(sink, brands=2, products=5, skus=10))
+
+        with pytest.raises(CatalogNotEmpty, match='already has rows'):
+            asyncio.run(load_catalog(sink, brands=2, products=5, skus=10))
+
+        # The refused second load left the first one untouched.
+        assert count(sink, 'SELECT COUNT(*) FROM sku') == 10
+        assert count(sink, 'SELECT COUNT(*) FROM product_color') == 2
+    finally:
+        sink.close()